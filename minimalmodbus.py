@@ -16,6 +16,10 @@
 #
 """MinimalModbus: A Python driver for Modbus RTU/ASCII via serial port."""
 
+# Annotations are not evaluated at runtime, so the typing module is only imported
+# by type checkers. This keeps the import time low on small hardware.
+from __future__ import annotations
+
 __author__ = "Jonas Berg"
 __license__ = "Apache License, Version 2.0"
 __url__ = "https://github.com/pyhys/minimalmodbus"
@@ -28,15 +32,34 @@ if sys.version_info < (3, 8, 0):
         "Your Python version is too old for this version of MinimalModbus"
     )
 
-import binascii
+import abc
+import array
+import bisect
+import collections
 import enum
 import os
 import struct
+import threading
 import time
-from typing import Any, Dict, List, Optional, Type, Union
 
 import serial
 
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import (
+        Any,
+        Callable,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Set,
+        Tuple,
+        Type,
+        Union,
+    )
+
 _NUMBER_OF_BYTES_BEFORE_REGISTERDATA = 1  # Within the payload
 _NUMBER_OF_BYTES_PER_REGISTER = 2
 _MAX_NUMBER_OF_REGISTERS_TO_WRITE = 123
@@ -48,18 +71,58 @@ _MAX_BYTEORDER_VALUE = 3
 _SECONDS_TO_MILLISECONDS = 1000
 _BROADCAST_DELAY: float = 0.2  # seconds
 _BITS_PER_BYTE = 8
+_BITTIMES_PER_CHARACTERTIME = 11  # Start bit, 8 data bits, parity or stop bit, stop bit
 _ASCII_HEADER = b":"
 _ASCII_FOOTER = b"\r\n"
 _BYTEPOSITION_FOR_ASCII_HEADER = 0  # Relative to plain response
 _BYTEPOSITION_FOR_SLAVEADDRESS = 0  # Relative to (stripped) response
 _BYTEPOSITION_FOR_FUNCTIONCODE = 1  # Relative to (stripped) response
 _BYTEPOSITION_FOR_SLAVE_ERROR_CODE = 2  # Relative to (stripped) response
+_BYTEPOSITION_FOR_BYTECOUNT = 2  # Relative to (stripped) response, for reads
+_BYTEPOSITION_FOR_PAYLOAD = 3  # Relative to (stripped) response, for reads
 _BITNUMBER_FUNCTIONCODE_ERRORINDICATION = 7
 _SLAVEADDRESS_BROADCAST = 0
+_MAX_SLAVEADDRESS = 247
+_MAX_RTU_FRAME_LENGTH = 256
+_NUMBER_OF_BYTES_IN_EXCEPTION_RESPONSE = 5  # Also the shortest parsed RTU frame
 
 # Several instrument instances can share the same serialport
-_serialports: Dict[str, serial.Serial] = {}  # Key: port name, value: port instance
+_serialports: Dict[str, Union[serial.Serial, Transport]] = (
+    {}
+)  # Key: port name, value: port instance
 _latest_read_times: Dict[str, float] = {}  # Key: port name, value: timestamp
+_port_states: Dict[str, _PortState] = {}  # Key: port name, see _get_port_state()
+_registry_lock = threading.Lock()  # Guards creation of ports and port states
+
+# Preallocated receive buffers, see Instrument.use_receive_buffer
+_RECEIVE_BUFFER_SIZE = _MAX_RTU_FRAME_LENGTH
+_receive_buffers = threading.local()  # Attribute "buffers": Dict[str, bytearray]
+
+# Compiled struct.Struct objects, see _get_struct()
+_structs: Dict[str, struct.Struct] = {}  # Key: format string
+
+# Complete read request frames, as the same reads are typically repeated at each poll
+_REQUEST_FRAME_CACHE_SIZE = 64
+_request_frame_cache: collections.OrderedDict[
+    Tuple[int, str, int, int, int], Tuple[bytes, int]
+] = collections.OrderedDict()  # Key: (slave, mode, functioncode, address, count)
+_request_frame_cache_lock = threading.Lock()  # Guards _request_frame_cache
+
+# Adaptive timeouts, see Instrument.adaptive_timeout
+_ADAPTIVE_TIMEOUT_MIN_SAMPLES = 8  # Responses to measure before adapting
+_ADAPTIVE_TIMEOUT_FACTOR = 2.0  # Times the slowest recent response latency
+_ADAPTIVE_TIMEOUT_MARGIN = 0.02  # seconds, minimum margin beyond the transfer time
+_ADAPTIVE_TIMEOUT_HYSTERESIS = 0.25  # Relative change needed to reconfigure the port
+_LATENCY_DECAY = 0.99  # Per response, to forget old slow responses
+
+# Waiting for the silent period, see _SilentPeriodWaiter.wait_until()
+_INITIAL_SPIN_TIME = 0.001  # seconds, until oversleeping has been measured
+_MAX_SPIN_TIME = 0.005  # seconds, longest busy wait before the deadline
+_OVERSLEEP_DECAY = 0.99  # Per sleep, to forget old long oversleeps
+
+# Listening for other masters, see Instrument.listen_before_talk
+_MAX_LISTEN_DEFERRALS = 5
+_MIN_LISTEN_POLL_INTERVAL = 0.0005  # seconds
 
 # ############### #
 # Named constants #
@@ -79,6 +142,13 @@ BYTEORDER_BIG_SWAP: int = 2
 BYTEORDER_LITTLE_SWAP: int = 3
 """Use litte endian byteorder, with swap."""
 
+FRAME_REQUEST: str = "request"
+"""A request from the master, see :class:`RtuFrameParser`."""
+FRAME_RESPONSE: str = "response"
+"""A normal response from a slave, see :class:`RtuFrameParser`."""
+FRAME_EXCEPTION: str = "exception"
+"""An exception response from a slave, see :class:`RtuFrameParser`."""
+
 
 @enum.unique
 class _Payloadformat(enum.Enum):
@@ -106,6 +176,10 @@ class Instrument:
           ``/dev/tty.usbserial`` (OS X) or ``COM4`` (Windows).
           It is also possible to pass in an already opened ``serial.Serial``
           object (new in version 2.1).
+          For Ethernet gateways, use ``rtu+tcp://host:port`` for RTU frames over
+          TCP, or ``tcp://host:port`` for Modbus TCP. See :class:`RtuOverTcpPort`
+          and :class:`ModbusTcpPort`. Any other :class:`Transport`, for example a
+          :class:`LoopbackPort`, can be passed in as well.
         * slaveaddress: Slave address in the range 0 to 247.
           Address 0 is for broadcast, and 248-255 are reserved.
         * mode: Mode selection. Can be :data:`minimalmodbus.MODE_RTU` or
@@ -117,7 +191,7 @@ class Instrument:
 
     def __init__(
         self,
-        port: Union[str, serial.Serial],
+        port: Union[str, serial.Serial, Transport],
         slaveaddress: int,
         mode: str = MODE_RTU,
         close_port_after_each_call: bool = False,
@@ -164,6 +238,16 @@ class Instrument:
         Changing this will not affect how other instruments use the same serial port.
         """
 
+        self.debug_handler: Optional[Callable[[str], None]] = None
+        """Callable receiving each debug message (str) instead of it being printed.
+        Defaults to :const:`None`, which prints to stdout.
+
+        The messages are only formatted when :attr:`debug` is :const:`True`, so
+        leaving :attr:`debug` disabled costs no formatting work per transaction.
+
+        Changing this will not affect how other instruments use the same serial port.
+        """
+
         self.clear_buffers_before_each_transaction = True
         """If this is :const:`True`, the serial port read and write buffers are cleared
         before each request to the instrument, to avoid cumulative byte sync errors
@@ -174,6 +258,20 @@ class Instrument:
         New in version 1.0.
         """
 
+        self.clear_buffers_only_if_needed = False
+        """If this is :const:`True`, the buffers are cleared (see
+        :attr:`clear_buffers_before_each_transaction`) only if there are received
+        bytes waiting, for example from noise on the bus or a late response.
+        Defaults to :const:`False`.
+
+        On a clean bus this saves a system call per transaction, as checking for
+        waiting bytes takes one call and clearing the buffers takes two. The output
+        buffer is then not cleared, as each transaction waits for its response
+        anyway. The events are counted in :attr:`port_statistics`.
+
+        Changing this will not affect how other instruments use the same serial port.
+        """
+
         self.close_port_after_each_call = close_port_after_each_call
         """If this is :const:`True`, the serial port will be closed after each call.
         Defaults to :const:`False`.
@@ -183,6 +281,20 @@ class Instrument:
         Most often set by the constructor (see the class documentation).
         """
 
+        self.close_port_after_idle: Optional[float] = None
+        """If this is a number of seconds, the serial port is kept open between calls,
+        and closed when it has not been used for that long. Defaults to :const:`None`
+        (the port is kept open).
+
+        This lets other programs use the port between batches of calls, without
+        opening and closing it for each call. A background timer closes the port, so
+        use :meth:`close_port` when the program stops. Not used if
+        :attr:`close_port_after_each_call` is :const:`True`.
+
+        The idle time is shared by the instruments on the same port, the latest call
+        sets it.
+        """
+
         self.handle_local_echo = False
         """Set to to :const:`True` if your RS-485 adaptor has local echo enabled. Then
         the transmitted message will immeadiately appear at the receive line of the
@@ -194,9 +306,75 @@ class Instrument:
         New in version 0.7.
         """
 
-        self.serial: Optional[serial.Serial] = None
-        """The serial port object as defined by the pySerial module. Created by the
-        constructor.
+        self.prevalidated = False
+        """Set this to :const:`True` to validate the arguments of
+        :meth:`read_registers` only once for each combination of slave address,
+        function code, register address and number of registers. Defaults to
+        :const:`False`.
+
+        The first read of a combination is done as usual, and registers it. Later
+        reads in RTU mode only take the request frame from the frame cache, write
+        it, read the response and verify its CRC, slave address, function code and
+        byte count. If any of these is wrong, the response goes through the usual
+        checks to raise the corresponding exception.
+
+        Use it when the same registers are polled over and over with arguments
+        that do not come from user input.
+        """
+
+        self._prevalidated_reads: Set[Tuple[int, str, int, int, int]] = set()
+
+        self.use_receive_buffer = False
+        """Set this to :const:`True` to read responses into a preallocated buffer
+        shared by the instruments on the same port and thread, instead of allocating
+        new bytes for each response. Defaults to :const:`False`.
+
+        It is used only if the serial port object has a ``readinto()`` method.
+        Note that pySerial implements ``readinto()`` on top of ``read()``, so the
+        gain is for transports with a native ``readinto()``.
+
+        The response then is a memoryview into the buffer, valid until the next
+        transaction of the same thread on the same port. As each thread has its own
+        buffer, other threads do not overwrite it after the port lock is released.
+        All methods of this class copy or decode the data they return before that.
+        """
+
+        self.adaptive_timeout = False
+        """Set this to :const:`True` to lower the read timeout of the serial port to
+        what the responses on the port actually need. Defaults to :const:`False`.
+
+        The timeout is then the transfer time of the longest response seen, plus
+        twice the slowest recent response latency (at least 20 ms). It never exceeds
+        the timeout set by the user, and the port is reconfigured only when the
+        timeout changes by more than 25 %. It starts adapting after 8 responses.
+        After a missing or short response the timeout set by the user is used again,
+        until 8 more responses have been measured.
+
+        This makes a missing slave fail faster. The measurements are shared by the
+        instruments on the same port.
+        """
+
+        self.listen_before_talk: Optional[float] = None
+        """If this is a number of seconds, the bus is watched for that long before
+        each request, and the request is deferred while traffic from other masters
+        is received. Defaults to :const:`None` (no listening). A
+        :meth:`transact_many` sweep listens only before its first request, and all
+        its requests fail with :exc:`BusBusyError` if the bus stays busy.
+
+        The time should be longer than the response time of the slaves, otherwise
+        the response to another master can start after the listening. A deferred
+        request waits a random time, which doubles on average for each deferral, and
+        then listens again. After 5 deferrals :exc:`BusBusyError` is raised. The
+        traffic is discarded, and the deferrals are counted in
+        :attr:`port_statistics`.
+
+        This needs a serial port with ``in_waiting``. Changing this will not affect
+        how other instruments use the same serial port.
+        """
+
+        self.serial: Optional[Union[serial.Serial, Transport]] = None
+        """The serial port object as defined by the pySerial module, or a
+        :class:`Transport`. Created by the constructor.
 
         Attributes that could be changed after initialisation:
 
@@ -216,37 +394,61 @@ class Instrument:
                 - Defaults to 2.0 s.
         """
 
+        reopen = False
         if _is_serial_object(port):
             self.serial = port  # type: ignore
-        elif isinstance(port, str) and (
-            port not in _serialports or not _serialports[port]
-        ):
-            self._print_debug("Create serial port {}".format(port))
-            self.serial = _serialports[port] = serial.Serial(
-                port=port,
-                baudrate=19200,
-                parity=serial.PARITY_NONE,
-                bytesize=8,
-                stopbits=1,
-                timeout=0.05,
-                write_timeout=2.0,
-            )
+        elif isinstance(port, str) and _is_socket_port_name(port):
+            # Connect without the registry lock, as a gateway that does not answer
+            # would block creating all other ports for the connect timeout
+            with _registry_lock:
+                existing_port = _serialports.get(port)
+            if existing_port:
+                self._print_debug("Serial port {} already exists", port)
+                self.serial = existing_port
+                reopen = True
+            else:
+                self._print_debug("Create serial port {}", port)
+                socketport = _create_socket_port(port)
+                with _registry_lock:
+                    if not _serialports.get(port):
+                        _serialports[port] = socketport
+                    self.serial = _serialports[port]
+                if self.serial is not socketport:
+                    socketport.close()  # Created by another thread meanwhile
+                    reopen = True
         elif isinstance(port, str):
-            self._print_debug("Serial port {} already exists".format(port))
-            self.serial = _serialports[port]
-            if (self.serial.port is None) or (not self.serial.is_open):
-                self._print_debug("Serial port {} is closed. Opening.".format(port))
-                self.serial.open()
+            with _registry_lock:
+                if port not in _serialports or not _serialports[port]:
+                    self._print_debug("Create serial port {}", port)
+                    self.serial = _serialports[port] = serial.Serial(
+                        port=port,
+                        baudrate=19200,
+                        parity=serial.PARITY_NONE,
+                        bytesize=8,
+                        stopbits=1,
+                        timeout=0.05,
+                        write_timeout=2.0,
+                    )
+                else:
+                    self._print_debug("Serial port {} already exists", port)
+                    self.serial = _serialports[port]
+                    reopen = True
 
         if self.serial is None or not _is_serial_object(self.serial):
             raise MasterReportedException("Failed to initialise serial port")
 
-        if not self.serial.is_open:
-            raise MasterReportedException("Failed to open serial port")
+        # Do not open or close the port during a transaction in another thread
+        with _get_port_state(_get_portname(self.serial)).lock:
+            if reopen and ((self.serial.port is None) or (not self.serial.is_open)):
+                self._print_debug("Serial port {} is closed. Opening.", port)
+                self.serial.open()
 
-        if self.close_port_after_each_call:
-            self._print_debug("Closing serial port {}".format(port))
-            self.serial.close()
+            if not self.serial.is_open:
+                raise MasterReportedException("Failed to open serial port")
+
+            if self.close_port_after_each_call:
+                self._print_debug("Closing serial port {}", port)
+                self.serial.close()
 
         self._latest_roundtrip_time: Optional[float] = None
 
@@ -289,9 +491,71 @@ class Instrument:
         """
         return self._latest_roundtrip_time
 
-    def _print_debug(self, text: str) -> None:
-        if self.debug:
+    @property
+    def port_statistics(self) -> Dict[str, float]:
+        """Usage statistics for the serial port of this instrument. Read only.
+
+        The statistics are shared by all instruments using the same port, and
+        count since the port was first used:
+
+            - acquisitions: Number of times the port was locked, for a
+              transaction, a :meth:`transact_many` sweep or for opening it.
+            - contentions: Number of times a transaction had to wait for another
+              thread to finish its transaction on the port.
+            - wait_time: Total time spent waiting for other threads, in seconds.
+            - max_wait_time: Longest single wait, in seconds.
+            - bus_time: Time the port was busy with transactions, in seconds. Measured
+              from writing each request to the end of reading its response, so it
+              includes the response latency of the slaves and any read timeouts.
+            - bus_utilization: The bus time as a fraction of the time since the port
+              was first used, between 0 and 1.
+            - response_latency: Slowest recent time from sending a request to the
+              start of the response, in seconds. See :attr:`adaptive_timeout`.
+            - sleeps: Number of times a transaction slept for the silent period.
+            - oversleep_time: Total time these sleeps lasted longer than asked for,
+              in seconds. The sleeps end early to make up for it, by busy waiting
+              the last part of the silent period.
+            - max_oversleep_time: Longest single oversleep, in seconds.
+            - noise_events: Number of times there were unexpected received bytes
+              before a transaction. Counted only with
+              :attr:`clear_buffers_only_if_needed`.
+            - noise_bytes: Total number of these bytes.
+            - bus_busy_events: Number of requests deferred because of traffic from
+              other masters. See :attr:`listen_before_talk`.
+            - bus_busy_errors: Number of times :exc:`BusBusyError` was raised.
+        """
+        assert self.serial is not None
+        return _get_port_state(_get_portname(self.serial)).get_statistics()
+
+    def close_port(self) -> None:
+        """Close the serial port now, and stop the idle timer.
+
+        See :attr:`close_port_after_idle`. The port is opened again by the next call.
+        """
+        if self.serial is None:
+            return
+        portstate = _get_port_state(_get_portname(self.serial))
+        with portstate.lock:
+            portstate.idle_closer.cancel()
+            self._print_debug("Closing port {}", self.serial.port)
+            self.serial.close()
+
+    def _print_debug(self, template: str, *args: Any) -> None:
+        """Emit a debug message, formatting it only if debug mode is enabled.
+
+        Args:
+            * template: Message, possibly with ``{}`` placeholders.
+            * args: Values for the placeholders. Expensive descriptions (for
+              example :func:`_describe_bytes`) should be guarded by
+              ``if self.debug:`` at the call site.
+        """
+        if not self.debug:
+            return
+        text = template.format(*args) if args else template
+        if self.debug_handler is None:
             print("MinimalModbus debug mode. " + text)
+        else:
+            self.debug_handler(text)
 
     # ################################# #
     #  Methods for talking to the slave #
@@ -618,6 +882,72 @@ class Instrument:
             )
         )
 
+    def read_longs(
+        self,
+        registeraddress: int,
+        number_of_values: int,
+        functioncode: int = 3,
+        signed: bool = False,
+        byteorder: int = BYTEORDER_BIG,
+        number_of_registers: int = 2,
+    ) -> List[int]:
+        """Read several long integers (32 or 64 bits) from consecutive registers.
+
+        All values are read in one transaction, and decoded in one call. See
+        :meth:`read_long` for the data types.
+
+        Args:
+            * registeraddress: The slave register start address.
+            * number_of_values: The number of long integers to read. At most
+              62 (or 31 for 64-bit values), as max 125 registers can be read.
+            * functioncode: Modbus function code. Can be 3 or 4.
+            * signed: Whether the data should be interpreted as unsigned or signed.
+            * byteorder: How multi-register data should be interpreted.
+              Use the BYTEORDER_xxx constants. Defaults to
+              :data:`minimalmodbus.BYTEORDER_BIG`.
+            * number_of_registers: The number of registers allocated for each long.
+              Can be 2 or 4.
+
+        Returns:
+            A list of numerical values. The first value in the list is for
+            the register at the given address.
+
+        Raises:
+            TypeError, ValueError, ModbusException,
+            serial.SerialException (inherited from IOError)
+        """
+        _check_functioncode(functioncode, [3, 4])
+        _check_bool(signed, description="signed")
+        _check_int(
+            number_of_registers,
+            minvalue=2,
+            maxvalue=4,
+            description="number of registers",
+        )
+        if number_of_registers not in [2, 4]:
+            raise ValueError(
+                "The number of registers for long must be 2 or 4. "
+                + "Given {0!r}".format(number_of_registers)
+            )
+        _check_int(
+            number_of_values,
+            minvalue=1,
+            maxvalue=_MAX_NUMBER_OF_REGISTERS_TO_READ // number_of_registers,
+            description="number of values",
+        )
+        _check_int(
+            byteorder,
+            minvalue=0,
+            maxvalue=_MAX_BYTEORDER_VALUE,
+            description="byteorder",
+        )
+        registerdata = self._read_registerdata(
+            functioncode, registeraddress, number_of_values * number_of_registers
+        )
+        return _bytes_to_longs(
+            registerdata, number_of_values, signed, number_of_registers, byteorder
+        )
+
     def write_long(
         self,
         registeraddress: int,
@@ -748,6 +1078,69 @@ class Instrument:
             )
         )
 
+    def read_floats(
+        self,
+        registeraddress: int,
+        number_of_values: int,
+        functioncode: int = 3,
+        number_of_registers: int = 2,
+        byteorder: int = BYTEORDER_BIG,
+    ) -> List[float]:
+        """Read several floating point numbers from consecutive registers.
+
+        All values are read in one transaction, and decoded in one call. See
+        :meth:`read_float` for the encoding.
+
+        Args:
+            * registeraddress: The slave register start address.
+            * number_of_values: The number of floats to read. At most 62
+              (or 31 for double precision), as max 125 registers can be read.
+            * functioncode: Modbus function code. Can be 3 or 4.
+            * number_of_registers: The number of registers allocated for each float.
+              Can be 2 or 4.
+            * byteorder: How multi-register data should be interpreted.
+              Use the BYTEORDER_xxx constants. Defaults to
+              :data:`minimalmodbus.BYTEORDER_BIG`.
+
+        Returns:
+            A list of numerical values. The first value in the list is for
+            the register at the given address.
+
+        Raises:
+            TypeError, ValueError, ModbusException,
+            serial.SerialException (inherited from IOError)
+        """
+        _check_functioncode(functioncode, [3, 4])
+        _check_int(
+            number_of_registers,
+            minvalue=2,
+            maxvalue=4,
+            description="number of registers",
+        )
+        if number_of_registers not in [2, 4]:
+            raise ValueError(
+                "The number of registers for float must be 2 or 4. "
+                + "Given {0!r}".format(number_of_registers)
+            )
+        _check_int(
+            number_of_values,
+            minvalue=1,
+            maxvalue=_MAX_NUMBER_OF_REGISTERS_TO_READ // number_of_registers,
+            description="number of values",
+        )
+        _check_int(
+            byteorder,
+            minvalue=0,
+            maxvalue=_MAX_BYTEORDER_VALUE,
+            description="byteorder",
+        )
+        registerdata = self._read_registerdata(
+            functioncode, registeraddress, number_of_values * number_of_registers
+        )
+        return _bytes_to_floats(
+            registerdata, number_of_values, number_of_registers, byteorder
+        )
+
     def write_float(
         self,
         registeraddress: int,
@@ -917,6 +1310,17 @@ class Instrument:
             TypeError, ValueError, ModbusException,
             serial.SerialException (inherited from IOError)
         """
+        if self.prevalidated:
+            key = (
+                self.address,
+                self.mode,
+                functioncode,
+                registeraddress,
+                number_of_registers,
+            )
+            if key in self._prevalidated_reads:
+                return self._read_registers_prevalidated(key)
+
         _check_functioncode(functioncode, [3, 4])
         _check_int(
             number_of_registers,
@@ -930,10 +1334,72 @@ class Instrument:
             number_of_registers=number_of_registers,
             payloadformat=_Payloadformat.REGISTERS,
         )
+        if self.prevalidated and self.mode == MODE_RTU:
+            self._prevalidated_reads.add(key)
+
         # Make sure that we really return a list of integers
         assert isinstance(returnvalue, list)
         return [int(x) for x in returnvalue]
 
+    def _read_registers_prevalidated(
+        self, key: Tuple[int, str, int, int, int]
+    ) -> List[int]:
+        """Read registers with arguments that have already been validated.
+
+        Args:
+            key: Slave address, mode (RTU), function code, register address and
+                number of registers, as registered by :meth:`read_registers`.
+
+        Returns:
+            The register data.
+
+        Raises:
+            ModbusException, serial.SerialException (inherited from IOError)
+        """
+        _, _, functioncode, registeraddress, number_of_registers = key
+        frame = _get_request_frame(key)
+        if frame is None:
+            payload_to_slave = struct.pack(">HH", registeraddress, number_of_registers)
+            frame = self._build_request(functioncode, payload_to_slave)
+            _store_request_frame(key, frame)
+        request_bytes, number_of_bytes_to_read = frame
+
+        response = self._communicate(
+            request_bytes, number_of_bytes_to_read, validate=False
+        )
+
+        if (
+            len(response) != number_of_bytes_to_read
+            or response[_BYTEPOSITION_FOR_SLAVEADDRESS] != self.address
+            or response[_BYTEPOSITION_FOR_FUNCTIONCODE] != functioncode
+            or response[_BYTEPOSITION_FOR_BYTECOUNT]
+            != number_of_registers * _NUMBER_OF_BYTES_PER_REGISTER
+            or not _check_crc_frame(response)
+        ):
+            # Let the usual checks raise a descriptive exception
+            payload_from_slave = _extract_payload(
+                response, self.address, self.mode, functioncode
+            )
+            return _parse_payload(  # type: ignore
+                payload_from_slave,
+                functioncode,
+                registeraddress,
+                None,
+                0,
+                number_of_registers,
+                0,
+                False,
+                BYTEORDER_BIG,
+                _Payloadformat.REGISTERS,
+            )
+
+        # Decode directly from the response frame, after the byte count
+        return list(
+            _get_struct(">{}H".format(number_of_registers)).unpack_from(
+                response, _BYTEPOSITION_FOR_PAYLOAD
+            )
+        )
+
     def write_registers(self, registeraddress: int, values: List[int]) -> None:
         """Write integers to 16-bit registers in the slave.
 
@@ -981,86 +1447,420 @@ class Instrument:
             payloadformat=_Payloadformat.REGISTERS,
         )
 
-    # ############### #
-    # Generic command #
-    # ############### #
+    def transact_many(
+        self, requests: List[Tuple[int, int, int, int]]
+    ) -> List[Union[List[int], Exception]]:
+        """Read from several slaves on the same bus, in one sweep.
 
-    def _generic_command(
-        self,
-        functioncode: int,
-        registeraddress: int,
-        value: Union[None, str, int, float, List[int]] = None,
-        number_of_decimals: int = 0,
-        number_of_registers: int = 0,
-        number_of_bits: int = 0,
-        signed: bool = False,
-        byteorder: int = BYTEORDER_BIG,
-        payloadformat: _Payloadformat = _Payloadformat.REGISTER,
-    ) -> Any:
-        """Perform generic command for reading and writing registers and bits.
+        The requests are sent back-to-back on the serial port of this instrument,
+        waiting only for the minimum silent period after each response. The port
+        is opened (and the buffers cleared) once for the whole sweep, and closed
+        after it if :attr:`close_port_after_each_call` is :const:`True`.
 
-        Args:
-            * functioncode: Modbus function code.
-            * registeraddress: The register address.
-            * value (numerical or string or None or list of int): The value to store
-              in the register. Depends on payloadformat.
-            * number_of_decimals: The number of decimals for content conversion.
-              Only for a single register.
-            * number_of_registers: The number of registers to read/write.
-              Only certain values allowed, depends on payloadformat.
-            * number_of_bits: The number of bits to read/write.
-            * signed: Whether the data should be interpreted as unsigned or signed.
-              Only for a single register or for payloadformat='long'.
-            * byteorder: How multi-register data should be interpreted.
-            * payloadformat: An _Payloadformat enum
+        The other settings of this instrument, for example :attr:`mode` and
+        :attr:`handle_local_echo`, are used for all requests. Its slave address
+        is not used.
 
-        If a value of 77.0 is stored internally in the slave register as 770,
-        then use ``number_of_decimals=1`` which will divide the received data
-        from the slave by 10 before returning the value. Similarly
-        ``number_of_decimals=2`` will divide the received data by 100 before returning
-        the value. Same functionality is also used when writing data to the slave.
+        Args:
+            * requests: List of (slaveaddress, functioncode, registeraddress,
+              number_of_items) tuples. Use function code 1 or 2 to read
+              number_of_items bits, and function code 3 or 4 to read
+              number_of_items registers. Broadcast is not allowed.
 
         Returns:
-            The register data in numerical value (int or float), or the bit value 0 or
-            1 (int), or a list of int, or ``None``.
-
-            Returns ``None`` for all write function codes.
+            A list with one item per request, in the same order. The item is the
+            list of bit values or register values, or the exception for that
+            request (ValueError, TypeError or ModbusException).
 
         Raises:
-            TypeError, ValueError, ModbusException,
+            TypeError, ModbusException,
             serial.SerialException (inherited from IOError)
+
+        A failing request does not stop the sweep, but an error on the serial port
+        itself does.
+
+        With a port that supports several outstanding requests, like
+        :class:`ModbusTcpPort` with a :attr:`~ModbusTcpPort.pipeline_depth` above 1,
+        the next requests are sent before the responses arrive.
         """
-        ALL_ALLOWED_FUNCTIONCODES = [1, 2, 3, 4, 5, 6, 15, 16]
-        ALLOWED_FUNCTIONCODES_BROADCAST = [5, 6, 15, 16]
-        ALLOWED_FUNCTIONCODES = {}
-        ALLOWED_FUNCTIONCODES[_Payloadformat.BIT] = [1, 2, 5, 15]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.BITS] = [1, 2, 15]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.REGISTER] = [3, 4, 6, 16]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.FLOAT] = [3, 4, 16]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.STRING] = [3, 4, 16]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.LONG] = [3, 4, 16]
-        ALLOWED_FUNCTIONCODES[_Payloadformat.REGISTERS] = [3, 4, 16]
+        if not isinstance(requests, list):
+            raise TypeError(
+                'The "requests" parameter must be a list. Given: {0!r}'.format(requests)
+            )
+        if self.serial is None:
+            raise ModbusException("The serial port instance is None")
 
-        # Check input values
-        _check_functioncode(functioncode, ALL_ALLOWED_FUNCTIONCODES)
-        _check_registeraddress(registeraddress)
-        _check_int(
-            number_of_decimals,
-            minvalue=0,
-            maxvalue=_MAX_NUMBER_OF_DECIMALS,
-            description="number of decimals",
-        )
-        _check_int(
-            number_of_registers,
-            minvalue=0,
-            maxvalue=max(
-                _MAX_NUMBER_OF_REGISTERS_TO_READ, _MAX_NUMBER_OF_REGISTERS_TO_WRITE
-            ),
-            description="number of registers",
-        )
-        _check_int(
-            number_of_bits,
-            minvalue=0,
+        frames: List[Union[Tuple[bytes, int], Exception]] = []
+        for request in requests:
+            try:
+                frames.append(self._build_sweep_request(*request))
+            except (TypeError, ValueError) as exc:
+                frames.append(exc)
+
+        results: List[Union[List[int], Exception]] = []
+        portname = _get_portname(self.serial)
+        portstate = _get_port_state(portname)
+        with portstate.lock:
+            self._open_port()
+            try:
+                if self.clear_buffers_before_each_transaction:
+                    self._clear_buffers(portname, portstate)
+                timing = portstate.get_timing(self.serial)
+                pipeline_depth = getattr(self.serial, "pipeline_depth", 1)
+                if pipeline_depth > 1 and not self.handle_local_echo:
+                    return self._sweep_pipelined(
+                        portname, portstate, pipeline_depth, requests, frames
+                    )
+
+                # The bus stays busy with this sweep, so other masters are
+                # listened for only once
+                if self.listen_before_talk is not None:
+                    try:
+                        self._wait_for_idle_bus(portname, portstate, timing)
+                    except BusBusyError as exc:
+                        return [
+                            frame if isinstance(frame, Exception) else exc
+                            for frame in frames
+                        ]
+
+                for request, frame in zip(requests, frames):
+                    if isinstance(frame, Exception):
+                        results.append(frame)
+                        continue
+                    try:
+                        results.append(
+                            self._sweep_request(
+                                portname, portstate, timing, request, frame
+                            )
+                        )
+                    except ModbusException as exc:
+                        results.append(exc)
+                        # Drop any remains of a bad response before the next request
+                        if self.clear_buffers_before_each_transaction:
+                            self._clear_buffers(portname, portstate)
+            finally:
+                self._release_port(portname)
+
+        return results
+
+    def _sweep_request(
+        self,
+        portname: str,
+        portstate: _PortState,
+        timing: _PortTiming,
+        request: Tuple[int, int, int, int],
+        frame: Tuple[bytes, int],
+    ) -> List[int]:
+        """Perform one read request of a :meth:`transact_many` sweep.
+
+        The port should be locked and open.
+
+        Args:
+            * portname: The port name.
+            * portstate: The state of the port.
+            * timing: The timing parameters of the port.
+            * request: See :meth:`transact_many`.
+            * frame: The raw request, and the number of bytes to read.
+
+        Returns:
+            The bit values or register values.
+
+        Raises:
+            ModbusException, serial.SerialException (inherited from IOError)
+        """
+        request_bytes, number_of_bytes_to_read = frame
+
+        if self.debug:
+            self._print_debug(
+                "Will write to instrument (expecting {} bytes back): {}",
+                number_of_bytes_to_read,
+                _describe_bytes(request_bytes),
+            )
+        if self.adaptive_timeout:
+            self._adapt_timeout(portname, portstate, timing)
+        self._wait_for_silent_period(portname, portstate, timing.minimum_silent_period)
+        answer = self._write_and_read(portname, request_bytes, number_of_bytes_to_read)
+        assert self._latest_roundtrip_time is not None
+        portstate.record_transaction(
+            timing,
+            len(request_bytes),
+            len(answer),
+            number_of_bytes_to_read,
+            self._latest_roundtrip_time,
+        )
+        return self._parse_sweep_response(request, answer)
+
+    def _sweep_pipelined(
+        self,
+        portname: str,
+        portstate: _PortState,
+        pipeline_depth: int,
+        requests: List[Tuple[int, int, int, int]],
+        frames: List[Union[Tuple[bytes, int], Exception]],
+    ) -> List[Union[List[int], Exception]]:
+        """Perform a :meth:`transact_many` sweep with several outstanding requests.
+
+        This is for ports that match responses to requests, see
+        :class:`ModbusTcpPort`. The responses are read in request order. There is no
+        silent period.
+
+        The port should be locked and open.
+
+        Args:
+            * portname: The port name.
+            * portstate: The state of the port.
+            * pipeline_depth: Maximum number of outstanding requests.
+            * requests: See :meth:`transact_many`.
+            * frames: For each request, the raw request and the number of bytes to
+              read, or the exception from validating the request.
+
+        Returns:
+            See :meth:`transact_many`.
+
+        Raises:
+            serial.SerialException (inherited from IOError)
+        """
+        assert self.serial is not None
+        results: List[Union[List[int], Exception]] = [
+            frame if isinstance(frame, Exception) else [] for frame in frames
+        ]
+        outstanding: collections.deque[int] = collections.deque()
+        start_time = time.monotonic()
+
+        def receive_oldest() -> None:
+            assert self.serial is not None
+            index = outstanding.popleft()
+            frame = frames[index]
+            assert not isinstance(frame, Exception)
+            answer = self.serial.read(frame[1])
+            _latest_read_times[portname] = time.monotonic()
+            if self.debug:
+                self._print_debug(
+                    "Response from instrument: {}", _describe_bytes(answer)
+                )
+            try:
+                results[index] = self._parse_sweep_response(requests[index], answer)
+            except ModbusException as exc:
+                results[index] = exc
+
+        for index, frame in enumerate(frames):
+            if isinstance(frame, Exception):
+                continue
+            if len(outstanding) >= pipeline_depth:
+                receive_oldest()
+            if self.debug:
+                self._print_debug(
+                    "Will write to instrument (expecting {} bytes back): {}",
+                    frame[1],
+                    _describe_bytes(frame[0]),
+                )
+            self.serial.write(frame[0])
+            outstanding.append(index)
+        while outstanding:
+            receive_oldest()
+        portstate.bus_statistics.bus_time += time.monotonic() - start_time
+        return results
+
+    def _parse_sweep_response(
+        self, request: Tuple[int, int, int, int], answer: Union[bytes, memoryview]
+    ) -> List[int]:
+        """Parse the response to one read request of a :meth:`transact_many` sweep.
+
+        Args:
+            * request: See :meth:`transact_many`.
+            * answer: The raw response.
+
+        Returns:
+            The bit values or register values.
+
+        Raises:
+            ModbusException
+        """
+        slaveaddress, functioncode, registeraddress, number_of_items = request
+        if not answer:
+            raise NoResponseError("No communication with the instrument (no answer)")
+
+        payload_from_slave = _extract_payload(
+            answer, slaveaddress, self.mode, functioncode
+        )
+        if functioncode in [1, 2]:
+            result = _parse_payload(
+                payload_from_slave,
+                functioncode,
+                registeraddress,
+                None,
+                0,
+                0,
+                number_of_items,
+                False,
+                BYTEORDER_BIG,
+                _Payloadformat.BITS,
+            )
+        else:
+            result = _parse_payload(
+                payload_from_slave,
+                functioncode,
+                registeraddress,
+                None,
+                0,
+                number_of_items,
+                0,
+                False,
+                BYTEORDER_BIG,
+                _Payloadformat.REGISTERS,
+            )
+
+        # Make sure that we really return a list of integers
+        assert isinstance(result, list)
+        return [int(x) for x in result]
+
+    def _build_sweep_request(
+        self,
+        slaveaddress: int,
+        functioncode: int,
+        registeraddress: int,
+        number_of_items: int,
+    ) -> Tuple[bytes, int]:
+        """Validate a read request for :meth:`transact_many` and build its frame.
+
+        Args:
+            * slaveaddress: The slave address, not broadcast.
+            * functioncode: Modbus function code, 1 to 4.
+            * registeraddress: The slave register start address.
+            * number_of_items: The number of bits or registers to read.
+
+        Returns:
+            The raw request, and the number of bytes to read.
+
+        Raises:
+            TypeError, ValueError
+        """
+        if slaveaddress == _SLAVEADDRESS_BROADCAST:
+            raise ValueError(
+                "Reading is not possible with broadcast (slave address 0), as "
+                + "the slaves do not respond. Given function code: {0!r}".format(
+                    functioncode
+                )
+            )
+        _check_slaveaddress(slaveaddress)
+        _check_functioncode(functioncode, [1, 2, 3, 4])
+        _check_registeraddress(registeraddress)
+        if functioncode in [1, 2]:
+            _check_int(
+                number_of_items,
+                minvalue=1,
+                maxvalue=_MAX_NUMBER_OF_BITS_TO_READ,
+                description="number of bits",
+            )
+        else:
+            _check_int(
+                number_of_items,
+                minvalue=1,
+                maxvalue=_MAX_NUMBER_OF_REGISTERS_TO_READ,
+                description="number of registers",
+            )
+
+        cache_key = (
+            slaveaddress,
+            self.mode,
+            functioncode,
+            registeraddress,
+            number_of_items,
+        )
+        frame = _get_request_frame(cache_key)
+        if frame is not None:
+            return frame
+
+        payload_to_slave = _num_to_two_bytes(registeraddress) + _num_to_two_bytes(
+            number_of_items
+        )
+        frame = (
+            _embed_payload(slaveaddress, self.mode, functioncode, payload_to_slave),
+            _predict_response_size(self.mode, functioncode, payload_to_slave),
+        )
+        _store_request_frame(cache_key, frame)
+        return frame
+
+    # ############### #
+    # Generic command #
+    # ############### #
+
+    def _generic_command(
+        self,
+        functioncode: int,
+        registeraddress: int,
+        value: Union[None, str, int, float, List[int]] = None,
+        number_of_decimals: int = 0,
+        number_of_registers: int = 0,
+        number_of_bits: int = 0,
+        signed: bool = False,
+        byteorder: int = BYTEORDER_BIG,
+        payloadformat: _Payloadformat = _Payloadformat.REGISTER,
+    ) -> Any:
+        """Perform generic command for reading and writing registers and bits.
+
+        Args:
+            * functioncode: Modbus function code.
+            * registeraddress: The register address.
+            * value (numerical or string or None or list of int): The value to store
+              in the register. Depends on payloadformat.
+            * number_of_decimals: The number of decimals for content conversion.
+              Only for a single register.
+            * number_of_registers: The number of registers to read/write.
+              Only certain values allowed, depends on payloadformat.
+            * number_of_bits: The number of bits to read/write.
+            * signed: Whether the data should be interpreted as unsigned or signed.
+              Only for a single register or for payloadformat='long'.
+            * byteorder: How multi-register data should be interpreted.
+            * payloadformat: An _Payloadformat enum
+
+        If a value of 77.0 is stored internally in the slave register as 770,
+        then use ``number_of_decimals=1`` which will divide the received data
+        from the slave by 10 before returning the value. Similarly
+        ``number_of_decimals=2`` will divide the received data by 100 before returning
+        the value. Same functionality is also used when writing data to the slave.
+
+        Returns:
+            The register data in numerical value (int or float), or the bit value 0 or
+            1 (int), or a list of int, or ``None``.
+
+            Returns ``None`` for all write function codes.
+
+        Raises:
+            TypeError, ValueError, ModbusException,
+            serial.SerialException (inherited from IOError)
+        """
+        ALL_ALLOWED_FUNCTIONCODES = [1, 2, 3, 4, 5, 6, 15, 16]
+        ALLOWED_FUNCTIONCODES_BROADCAST = [5, 6, 15, 16]
+        ALLOWED_FUNCTIONCODES = {}
+        ALLOWED_FUNCTIONCODES[_Payloadformat.BIT] = [1, 2, 5, 15]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.BITS] = [1, 2, 15]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.REGISTER] = [3, 4, 6, 16]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.FLOAT] = [3, 4, 16]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.STRING] = [3, 4, 16]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.LONG] = [3, 4, 16]
+        ALLOWED_FUNCTIONCODES[_Payloadformat.REGISTERS] = [3, 4, 16]
+
+        # Check input values
+        _check_functioncode(functioncode, ALL_ALLOWED_FUNCTIONCODES)
+        _check_registeraddress(registeraddress)
+        _check_int(
+            number_of_decimals,
+            minvalue=0,
+            maxvalue=_MAX_NUMBER_OF_DECIMALS,
+            description="number of decimals",
+        )
+        _check_int(
+            number_of_registers,
+            minvalue=0,
+            maxvalue=max(
+                _MAX_NUMBER_OF_REGISTERS_TO_READ, _MAX_NUMBER_OF_REGISTERS_TO_WRITE
+            ),
+            description="number of registers",
+        )
+        _check_int(
+            number_of_bits,
+            minvalue=0,
             maxvalue=max(_MAX_NUMBER_OF_BITS_TO_READ, _MAX_NUMBER_OF_BITS_TO_WRITE),
             description="number of bits",
         )
@@ -1259,21 +2059,49 @@ class Instrument:
                     )
                 )
 
-        # Create payload
-        payload_to_slave = _create_payload(
-            functioncode,
-            registeraddress,
-            value,
-            number_of_decimals,
-            number_of_registers,
-            number_of_bits,
-            signed,
-            byteorder,
-            payloadformat,
-        )
+        # Read requests are taken from the frame cache when possible
+        if functioncode in [1, 2, 3, 4] and self.precalculate_read_size:
+            cache_key = (
+                self.address,
+                self.mode,
+                functioncode,
+                registeraddress,
+                number_of_registers or number_of_bits,
+            )
+            frame = _get_request_frame(cache_key)
+            if frame is None:
+                payload_to_slave = _create_payload(
+                    functioncode,
+                    registeraddress,
+                    value,
+                    number_of_decimals,
+                    number_of_registers,
+                    number_of_bits,
+                    signed,
+                    byteorder,
+                    payloadformat,
+                )
+                frame = self._build_request(functioncode, payload_to_slave)
+                _store_request_frame(cache_key, frame)
+
+            payload_from_slave = self._exchange(functioncode, *frame)
+
+        else:
+            # Create payload
+            payload_to_slave = _create_payload(
+                functioncode,
+                registeraddress,
+                value,
+                number_of_decimals,
+                number_of_registers,
+                number_of_bits,
+                signed,
+                byteorder,
+                payloadformat,
+            )
 
-        # Communicate with instrument
-        payload_from_slave = self._perform_command(functioncode, payload_to_slave)
+            # Communicate with instrument
+            payload_from_slave = self._perform_command(functioncode, payload_to_slave)
 
         # There is no response for broadcasts
         if self.address == _SLAVEADDRESS_BROADCAST:
@@ -1293,6 +2121,65 @@ class Instrument:
             payloadformat,
         )
 
+    def _read_registerdata(
+        self, functioncode: int, registeraddress: int, number_of_registers: int
+    ) -> bytes:
+        """Read the raw data of consecutive registers.
+
+        The function code and number of registers should have been checked before.
+
+        Args:
+            * functioncode: Modbus function code, 3 or 4.
+            * registeraddress: The slave register start address.
+            * number_of_registers: The number of registers to read.
+
+        Returns:
+            The register data, 2 bytes per register.
+
+        Raises:
+            TypeError, ValueError, ModbusException,
+            serial.SerialException (inherited from IOError)
+        """
+        _check_registeraddress(registeraddress)
+        if self.address == _SLAVEADDRESS_BROADCAST:
+            raise ValueError(
+                "Reading is not possible with broadcast (slave address 0), as "
+                + "the slaves do not respond. Given function code: {0!r}".format(
+                    functioncode
+                )
+            )
+
+        cache_key = (
+            self.address,
+            self.mode,
+            functioncode,
+            registeraddress,
+            number_of_registers,
+        )
+        frame = _get_request_frame(cache_key) if self.precalculate_read_size else None
+        if frame is None:
+            payload_to_slave = _num_to_two_bytes(registeraddress) + _num_to_two_bytes(
+                number_of_registers
+            )
+            frame = self._build_request(functioncode, payload_to_slave)
+            if self.precalculate_read_size:
+                _store_request_frame(cache_key, frame)
+
+        payload_from_slave = self._exchange(functioncode, *frame)
+        _check_response_payload(
+            payload_from_slave,
+            functioncode,
+            registeraddress,
+            None,
+            0,
+            number_of_registers,
+            0,
+            False,
+            BYTEORDER_BIG,
+            _Payloadformat.REGISTERS,
+        )
+        return payload_from_slave[_NUMBER_OF_BYTES_BEFORE_REGISTERDATA:]
+
     # #################################### #
     # Communication implementation details #
     # #################################### #
@@ -1318,11 +2205,28 @@ class Instrument:
         with the :func:`_embed_payload` function, and the parsing of the
         response is done with the :func:`_extract_payload` function.
         """
-        DEFAULT_NUMBER_OF_BYTES_TO_READ = 1000
-
         _check_functioncode(functioncode, None)
         _check_bytes(payload_to_slave, description="payload")
 
+        request_bytes, number_of_bytes_to_read = self._build_request(
+            functioncode, payload_to_slave
+        )
+        return self._exchange(functioncode, request_bytes, number_of_bytes_to_read)
+
+    def _build_request(
+        self, functioncode: int, payload_to_slave: bytes
+    ) -> Tuple[bytes, int]:
+        """Build the request frame and predict the size of the response.
+
+        Args:
+            * functioncode: The function code for the command to be performed.
+            * payload_to_slave: Data to be transmitted to the slave.
+
+        Returns:
+            The raw request, and the number of bytes to read (0 for broadcast).
+        """
+        DEFAULT_NUMBER_OF_BYTES_TO_READ = 1000
+
         # Build request
         request_bytes = _embed_payload(
             self.address, self.mode, functioncode, payload_to_slave
@@ -1338,17 +2242,29 @@ class Instrument:
                     self.mode, functioncode, payload_to_slave
                 )
             except Exception:
-                if self.debug:
-                    template = (
-                        "Could not precalculate response size for Modbus {} mode. "
-                        + "Will read {} bytes. Request: {!r}"
-                    )
-                    self._print_debug(
-                        template.format(
-                            self.mode, number_of_bytes_to_read, request_bytes
-                        )
-                    )
+                self._print_debug(
+                    "Could not precalculate response size for Modbus {} mode. "
+                    + "Will read {} bytes. Request: {!r}",
+                    self.mode,
+                    number_of_bytes_to_read,
+                    request_bytes,
+                )
+
+        return request_bytes, number_of_bytes_to_read
+
+    def _exchange(
+        self, functioncode: int, request_bytes: bytes, number_of_bytes_to_read: int
+    ) -> bytes:
+        """Send a request frame and extract the payload of the response.
 
+        Args:
+            * functioncode: The function code of the request, for checking.
+            * request_bytes: The raw request, as built by :meth:`_build_request`.
+            * number_of_bytes_to_read: Number of bytes to read (0 for broadcast).
+
+        Returns:
+            The extracted data payload from the slave.
+        """
         # Communicate
         response_bytes = self._communicate(request_bytes, number_of_bytes_to_read)
 
@@ -1361,15 +2277,21 @@ class Instrument:
         )
         return payload_from_slave
 
-    def _communicate(self, request: bytes, number_of_bytes_to_read: int) -> bytes:
+    def _communicate(
+        self, request: bytes, number_of_bytes_to_read: int, validate: bool = True
+    ) -> Union[bytes, memoryview]:
         """Talk to the slave via a serial port.
 
         Args:
             * request: The raw request that is to be sent to the slave.
             * number_of_bytes_to_read: Number of bytes to read
+            * validate: Whether to check the arguments. Only for requests built from
+              already validated arguments, see :attr:`prevalidated`.
 
         Returns:
-            The raw data returned from the slave.
+            The raw data returned from the slave. It is a memoryview into the receive
+            buffer of this thread if :attr:`Instrument.use_receive_buffer` is in
+            effect, valid until the next transaction of this thread on the port.
 
         Raises:
             TypeError, ValueError, ModbusException,
@@ -1405,128 +2327,1955 @@ class Instrument:
         It is about 16 ms on Windows according to
         stackoverflow.com/questions/157359/accurate-timestamping-in-python-logging
         """
-        _check_bytes(request, minlength=1, description="request")
-        _check_int(number_of_bytes_to_read)
+        if validate:
+            _check_bytes(request, minlength=1, description="request")
+            _check_int(number_of_bytes_to_read)
+
+        if self.debug:
+            self._print_debug(
+                "Will write to instrument (expecting {} bytes back): {}",
+                number_of_bytes_to_read,
+                _describe_bytes(request),
+            )
+
+        if self.serial is None:
+            raise ModbusException("The serial port instance is None")
+
+        portname = _get_portname(self.serial)
+        portstate = _get_port_state(portname)
+        with portstate.lock:
+            self._open_port()
+            try:
+                if self.clear_buffers_before_each_transaction:
+                    self._clear_buffers(portname, portstate)
+
+                timing = portstate.get_timing(self.serial)
+                if self.adaptive_timeout:
+                    self._adapt_timeout(portname, portstate, timing)
+
+                # Sleep to make sure 3.5 character times have passed
+                self._wait_for_silent_period(
+                    portname, portstate, timing.minimum_silent_period
+                )
+                if self.listen_before_talk is not None:
+                    self._wait_for_idle_bus(portname, portstate, timing)
+
+                answer = self._write_and_read(
+                    portname, request, number_of_bytes_to_read
+                )
+                assert self._latest_roundtrip_time is not None
+                portstate.record_transaction(
+                    timing,
+                    len(request),
+                    len(answer),
+                    number_of_bytes_to_read,
+                    self._latest_roundtrip_time,
+                )
+            finally:
+                self._release_port(portname)
+
+            if not answer and number_of_bytes_to_read > 0:
+                raise NoResponseError(
+                    "No communication with the instrument (no answer)"
+                )
+
+            if number_of_bytes_to_read == 0:
+                self._print_debug(
+                    "Broadcast delay: Sleeping for {} s", _BROADCAST_DELAY
+                )
+                time.sleep(_BROADCAST_DELAY)
+
+            return answer
+
+    def _open_port(self) -> None:
+        """Open the serial port if necessary."""
+        assert self.serial is not None
+        if not self.serial.is_open:
+            self._print_debug("Opening port {}", self.serial.port)
+            self.serial.open()
+
+    def _release_port(self, portname: str) -> None:
+        """Close the serial port after a transaction, or schedule closing it.
+
+        Args:
+            * portname: The port name.
+        """
+        assert self.serial is not None
+        if self.close_port_after_each_call:
+            self._print_debug("Closing port {}", portname)
+            self.serial.close()
+        elif self.close_port_after_idle is not None:
+            _get_port_state(portname).idle_closer.schedule(
+                self.serial, self.close_port_after_idle
+            )
+
+    def _adapt_timeout(
+        self, portname: str, portstate: _PortState, timing: _PortTiming
+    ) -> None:
+        """Set the read timeout from the measured responses.
+
+        See :attr:`adaptive_timeout`. The port should be locked.
+
+        Args:
+            * portname: The port name, for debug messages.
+            * portstate: The state of the port, with the measurements.
+            * timing: The timing parameters of the port.
+        """
+        assert self.serial is not None
+        times = portstate.response_times
+        current_timeout = self.serial.timeout
+        if not times.timeout_adapted or current_timeout != times.adapted_timeout:
+            times.configured_timeout = current_timeout  # Set by the user
+            times.timeout_adapted = False
+
+        timeout = times.configured_timeout
+        if times.latency_samples >= _ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            adapted_timeout = timing.frame_time(times.max_response_length) + max(
+                _ADAPTIVE_TIMEOUT_FACTOR * times.response_latency,
+                _ADAPTIVE_TIMEOUT_MARGIN,
+            )
+            if timeout is None or adapted_timeout < timeout:
+                timeout = adapted_timeout
+
+        if timeout == current_timeout:
+            return
+        if timeout is not None and current_timeout is not None:
+            if abs(timeout - current_timeout) <= (
+                _ADAPTIVE_TIMEOUT_HYSTERESIS * current_timeout
+            ):
+                return
+        self._print_debug("Setting the timeout for port {} to {} s", portname, timeout)
+        self.serial.timeout = timeout
+        times.adapted_timeout = timeout
+        times.timeout_adapted = True
+
+    def _clear_buffers(self, portname: str, portstate: _PortState) -> None:
+        """Clear the input and output buffers of the serial port.
+
+        See :attr:`clear_buffers_only_if_needed`.
+
+        Args:
+            * portname: The port name, for debug messages.
+            * portstate: The state of the port, for the noise statistics.
+        """
+        assert self.serial is not None
+        if self.clear_buffers_only_if_needed:
+            number_of_stray_bytes = self.serial.in_waiting
+            if not number_of_stray_bytes:
+                return
+            portstate.bus_statistics.noise_events += 1
+            portstate.bus_statistics.noise_bytes += number_of_stray_bytes
+            self._print_debug(
+                "Found {} stray bytes on port {}", number_of_stray_bytes, portname
+            )
+        self._print_debug("Clearing serial buffers for port {}", portname)
+        self.serial.reset_input_buffer()
+        self.serial.reset_output_buffer()
+
+    def _wait_for_silent_period(
+        self, portname: str, portstate: _PortState, minimum_silent_period: float
+    ) -> None:
+        """Wait until the minimum silent period has passed since the latest read.
+
+        Args:
+            * portname: The key in :data:`_latest_read_times`.
+            * portstate: The state of the port, which does the waiting.
+            * minimum_silent_period: The minimum silent period in seconds.
+        """
+        now = time.monotonic()
+        time_since_read = now - _latest_read_times.get(portname, 0)
+
+        if time_since_read < minimum_silent_period:
+            sleep_time = minimum_silent_period - time_since_read
+
+            self._print_debug(
+                "Sleeping {:.2f} ms before sending. "
+                + "Minimum silent period: {:.2f} ms, time since read: {:.2f} ms.",
+                sleep_time * _SECONDS_TO_MILLISECONDS,
+                minimum_silent_period * _SECONDS_TO_MILLISECONDS,
+                time_since_read * _SECONDS_TO_MILLISECONDS,
+            )
+
+            portstate.waiter.wait_until(now + sleep_time)
+
+        else:
+            self._print_debug(
+                "No sleep required before write. Time since "
+                + "previous read: {:.2f} ms, minimum silent period: {:.2f} ms.",
+                time_since_read * _SECONDS_TO_MILLISECONDS,
+                minimum_silent_period * _SECONDS_TO_MILLISECONDS,
+            )
+
+    def _wait_for_idle_bus(
+        self, portname: str, portstate: _PortState, timing: _PortTiming
+    ) -> None:
+        """Listen to the bus until it has been idle for :attr:`listen_before_talk`.
+
+        Args:
+            * portname: The port name, for debug messages.
+            * portstate: The state of the port, for the statistics.
+            * timing: The timing parameters of the port.
+
+        Raises:
+            BusBusyError, serial.SerialException (inherited from IOError)
+        """
+        import random
+
+        assert self.serial is not None
+        assert self.listen_before_talk is not None
+        poll_interval = max(timing.character_time, _MIN_LISTEN_POLL_INTERVAL)
+        backoff_time = self.listen_before_talk
+        for deferral in range(_MAX_LISTEN_DEFERRALS + 1):
+            if deferral:
+                delay = random.uniform(backoff_time / 2, backoff_time)
+                backoff_time *= 2
+                self._print_debug(
+                    "The bus on port {} is busy. Deferring the request by {:.1f} ms.",
+                    portname,
+                    delay * _SECONDS_TO_MILLISECONDS,
+                )
+                time.sleep(delay)
+            deadline = time.monotonic() + self.listen_before_talk
+            while not self.serial.in_waiting:
+                if time.monotonic() >= deadline:
+                    return
+                time.sleep(poll_interval)
+            self.serial.reset_input_buffer()  # Traffic of another master
+            portstate.bus_statistics.bus_busy_events += 1
+        portstate.bus_statistics.bus_busy_errors += 1
+        raise BusBusyError(
+            "The bus is busy with other traffic, tried {} times".format(
+                _MAX_LISTEN_DEFERRALS + 1
+            )
+        )
+
+    def _write_and_read(
+        self, portname: str, request: bytes, number_of_bytes_to_read: int
+    ) -> Union[bytes, memoryview]:
+        """Write a request to the open serial port and read the response.
+
+        Args:
+            * portname: The key in :data:`_latest_read_times`.
+            * request: The raw request that is to be sent to the slave.
+            * number_of_bytes_to_read: Number of bytes to read (0 for broadcast).
+
+        Returns:
+            The raw data returned from the slave, possibly empty.
+
+        Raises:
+            LocalEchoError, serial.SerialException (inherited from IOError)
+        """
+        assert self.serial is not None
+
+        # Write request
+        write_time = time.monotonic()
+        self.serial.write(request)
+
+        # Read and discard local echo
+        if self.handle_local_echo:
+            local_echo_to_discard = self.serial.read(len(request))
+            if self.debug:
+                self._print_debug(
+                    "Discarding this local echo: {}",
+                    _describe_bytes(local_echo_to_discard),
+                )
+            if local_echo_to_discard != request:
+                template = (
+                    "Local echo handling is enabled, but the local echo does "
+                    + "not match the sent request. "
+                    + "Request: {}, local echo: {}."
+                )
+                text = template.format(
+                    _describe_bytes(request),
+                    _describe_bytes(local_echo_to_discard),
+                )
+                raise LocalEchoError(text)
+
+        # Read response
+        answer: Union[bytes, memoryview]
+        if number_of_bytes_to_read > 0:
+            if self.use_receive_buffer and hasattr(self.serial, "readinto"):
+                answer = self._read_into_buffer(portname, number_of_bytes_to_read)
+            else:
+                answer = self.serial.read(number_of_bytes_to_read)
+        else:
+            answer = b""
+            self.serial.flush()
+
+        read_time = time.monotonic()
+        _latest_read_times[portname] = read_time
+        roundtrip_time = read_time - write_time
+        self._latest_roundtrip_time = roundtrip_time
+
+        if self.debug:
+            if isinstance(self.serial.timeout, float):
+                timeout_time = self.serial.timeout * _SECONDS_TO_MILLISECONDS
+            else:
+                timeout_time = 0
+            self._print_debug(
+                "Response from instrument: {}, roundtrip time: {:.1f} ms."
+                " Timeout for reading: {:.1f} ms.\n",
+                _describe_bytes(answer),
+                roundtrip_time,
+                timeout_time,
+            )
+
+        return answer
+
+    def _read_into_buffer(
+        self, portname: str, number_of_bytes_to_read: int
+    ) -> memoryview:
+        """Read from the serial port into the preallocated buffer for the port.
+
+        Args:
+            * portname: The key for the buffer of this thread.
+            * number_of_bytes_to_read: Number of bytes to read.
+
+        Returns:
+            A memoryview of the received bytes, see :attr:`use_receive_buffer`.
+        """
+        assert self.serial is not None
+        try:
+            buffers: Dict[str, bytearray] = _receive_buffers.buffers
+        except AttributeError:
+            buffers = _receive_buffers.buffers = {}
+        buffer = buffers.get(portname)
+        if buffer is None or len(buffer) < number_of_bytes_to_read:
+            buffer = buffers[portname] = bytearray(
+                max(number_of_bytes_to_read, _RECEIVE_BUFFER_SIZE)
+            )
+        view = memoryview(buffer)
+        number_of_bytes_read = self.serial.readinto(view[:number_of_bytes_to_read])
+        return view[: number_of_bytes_read or 0]
+
+
+# ########## #
+# Transports #
+# ########## #
+
+_SCHEME_RTU_OVER_TCP = "rtu+tcp://"
+_SCHEME_MODBUS_TCP = "tcp://"
+_SCHEME_LOOPBACK = "loopback://"
+_MBAP_HEADER_LENGTH = 7
+_MBAP_PROTOCOL_ID = 0
+_NUMBER_OF_CRC_BYTES = 2
+
+
+class Transport(abc.ABC):
+    """Base class for the ports that an :class:`.Instrument` talks through.
+
+    The interface is the part of the pySerial ``serial.Serial`` API that is used by
+    :class:`.Instrument`, so pySerial ports are used as they are for serial
+    communication.
+
+    Subclasses must implement :attr:`is_open`, :meth:`open`, :meth:`close`,
+    :meth:`write` and :meth:`readinto`, otherwise they can not be instantiated.
+    The other methods have defaults for transports without buffers.
+
+    Args:
+        * port: The port name. Instruments using the same port name share the
+          silent period timing and the port lock.
+        * timeout: Read timeout value in seconds, :const:`None` waits forever.
+        * baudrate: Baudrate in Baud, for the silent period between frames.
+    """
+
+    pipeline_depth = 1
+    """Maximum number of outstanding requests in :meth:`.Instrument.transact_many`.
+
+    Only transports that match responses to requests can have more than one.
+    """
+
+    def __init__(self, port: str, timeout: Optional[float], baudrate: int) -> None:
+        self.port = port
+        self.timeout = timeout
+        self.baudrate = baudrate
+
+    def __repr__(self) -> str:
+        """Give string representation of the transport."""
+        return "{}<port={!r}, timeout={}, is_open={}>".format(
+            self.__class__.__name__, self.port, self.timeout, self.is_open
+        )
+
+    @property
+    def minimum_silent_period(self) -> float:
+        """Time in seconds between a response and the next request.
+
+        Defaults to 3.5 character times at :attr:`baudrate`, as for a serial bus.
+        """
+        return _calculate_minimum_silent_period(self.baudrate)
+
+    @property
+    @abc.abstractmethod
+    def is_open(self) -> bool:
+        """Whether the transport is open."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def open(self) -> None:
+        """Open the transport."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """Close the transport."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def write(self, data: bytes) -> int:
+        """Send data, and return the number of bytes sent."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        """Receive into *buffer*, until it is full or the timeout expires.
+
+        Returns:
+            The number of bytes received.
+        """
+        raise NotImplementedError()
+
+    def read(self, size: int = 1) -> bytes:
+        """Receive *size* bytes, or less if the timeout expires first."""
+        buffer = bytearray(size)
+        number_of_bytes_read = self.readinto(buffer)
+        return bytes(buffer[:number_of_bytes_read])
+
+    @property
+    def in_waiting(self) -> int:
+        """Number of bytes that can be received without waiting."""
+        return 0
+
+    def reset_input_buffer(self) -> None:
+        """Discard data that has been received but not read."""
+
+    def reset_output_buffer(self) -> None:
+        """Discard data that has been written but not sent."""
+
+    def flush(self) -> None:
+        """Wait until all written data has been sent."""
+
+
+def _get_minimum_silent_period(serialport: Any) -> float:
+    """Return the minimum silent period for a port.
+
+    Args:
+        serialport: A :class:`Transport` or a pySerial port.
+
+    Returns:
+        The number of seconds that should pass between each message on the bus.
+    """
+    if isinstance(serialport, Transport):
+        return serialport.minimum_silent_period
+    return _calculate_minimum_silent_period(serialport.baudrate)
+
+
+class RtuOverTcpPort(Transport):
+    """Serial port lookalike for Modbus RTU frames tunneled over a TCP connection.
+
+    This is for RS485-to-Ethernet gateways in transparent mode, which forward the
+    RTU frames unchanged. The connection is kept open between transactions, and is
+    established again on the next transaction after an error.
+
+    Pass an instance to :class:`.Instrument` instead of a serial port name, or use a
+    port name like ``rtu+tcp://192.168.1.10:502``.
+
+    Args:
+        * port: The port name, ``rtu+tcp://host:port``.
+        * timeout: Read timeout value in seconds.
+        * baudrate: Baudrate of the RS485 bus behind the gateway. It is only used to
+          calculate the silent period between frames.
+        * connect_timeout: Timeout for establishing the connection, in seconds.
+
+    Raises:
+        TypeError, ValueError
+    """
+
+    _scheme = _SCHEME_RTU_OVER_TCP
+
+    def __init__(
+        self,
+        port: str,
+        timeout: float = 1.0,
+        baudrate: int = 19200,
+        connect_timeout: float = 3.0,
+    ) -> None:
+        self.host, self.tcp_port = _parse_socket_port(port, self._scheme)
+        super().__init__(port, timeout, baudrate)
+        self.connect_timeout = connect_timeout
+        self._socket: Any = None
+        self._received = bytearray()  # Received by in_waiting, but not read yet
+        self.open()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the connection is established."""
+        return self._socket is not None
+
+    def open(self) -> None:
+        """Establish the connection.
+
+        Raises:
+            serial.SerialException
+        """
+        import socket
+
+        self.close()
+        self._received.clear()
+        try:
+            connection = socket.create_connection(
+                (self.host, self.tcp_port), timeout=self.connect_timeout
+            )
+        except OSError as exc:
+            raise serial.SerialException(
+                "Could not connect to {}: {}".format(self.port, exc)
+            ) from exc
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = connection
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def write(self, data: bytes) -> int:
+        """Send data.
+
+        Raises:
+            serial.SerialException
+        """
+        self._send(data)
+        return len(data)
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        """Receive into *buffer*, until it is full or the timeout expires.
+
+        Returns:
+            The number of bytes received.
+
+        Raises:
+            serial.SerialException
+        """
+        return self._receive_into(memoryview(buffer).cast("B"), self.timeout)
+
+    @property
+    def in_waiting(self) -> int:
+        """Number of bytes that can be received without waiting.
+
+        The bytes that have arrived are received and kept until they are read, as a
+        socket does not tell how many there are.
+
+        Raises:
+            serial.SerialException
+        """
+        if self._socket is not None:
+            for chunk in self._receive_available():
+                self._received += chunk
+        return len(self._received)
+
+    def reset_input_buffer(self) -> None:
+        """Discard data that has been received but not read.
+
+        Raises:
+            serial.SerialException
+        """
+        self._received.clear()
+        if self._socket is not None:
+            for _ in self._receive_available():
+                pass
+
+    def _receive_available(self) -> Iterator[bytes]:
+        """Receive the chunks that have arrived, without waiting."""
+        import select
+
+        while self._socket is not None and select.select([self._socket], [], [], 0)[0]:
+            chunk = self._receive_chunk()
+            if not chunk:
+                break
+            yield chunk
+
+    def _send(self, data: bytes) -> None:
+        """Send all data, closing the connection on errors."""
+        if self._socket is None:
+            raise serial.SerialException("Port {} is not open".format(self.port))
+        try:
+            self._socket.sendall(data)
+        except OSError as exc:
+            self.close()
+            raise serial.SerialException(
+                "Connection to {} lost: {}".format(self.port, exc)
+            ) from exc
+
+    def _receive_chunk(self) -> bytes:
+        """Receive whatever is available, closing the connection on errors."""
+        assert self._socket is not None
+        try:
+            chunk = self._socket.recv(_RECEIVE_BUFFER_SIZE)
+        except OSError as exc:
+            self.close()
+            raise serial.SerialException(
+                "Connection to {} lost: {}".format(self.port, exc)
+            ) from exc
+        if not chunk:
+            self.close()
+        return chunk
+
+    def _receive_into(self, view: memoryview, timeout: Optional[float]) -> int:
+        """Receive into *view* until it is full or *timeout* seconds have passed.
+
+        A timeout of :const:`None` waits forever, like for pySerial.
+
+        Raises:
+            serial.SerialException
+        """
+        import socket
+
+        received = min(len(self._received), len(view))
+        if received:
+            view[:received] = self._received[:received]
+            del self._received[:received]
+        if self._socket is None:
+            if received:
+                return received  # Received before the connection was closed
+            raise serial.SerialException("Port {} is not open".format(self.port))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while received < len(view):
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._socket.settimeout(remaining)
+            else:
+                self._socket.settimeout(None)
+            try:
+                number_of_bytes = self._socket.recv_into(view[received:])
+            except socket.timeout:
+                break
+            except OSError as exc:
+                self.close()
+                raise serial.SerialException(
+                    "Connection to {} lost: {}".format(self.port, exc)
+                ) from exc
+            if not number_of_bytes:
+                self.close()
+                break
+            received += number_of_bytes
+        return received
+
+
+class ModbusTcpPort(RtuOverTcpPort):
+    """Serial port lookalike for Modbus TCP, the native Modbus protocol over TCP.
+
+    The RTU request frames from :class:`.Instrument` are sent with an MBAP header
+    instead of the CRC, using the slave address as unit identifier. The responses
+    are converted back to RTU frames. Use it with :data:`MODE_RTU`.
+
+    Each request gets a new transaction identifier, and the responses are matched
+    by it. Late responses to requests that timed out are discarded.
+
+    Several requests can be outstanding at the same time, see
+    :attr:`pipeline_depth`. The responses are read in request order.
+
+    Pass an instance to :class:`.Instrument` instead of a serial port name, or use a
+    port name like ``tcp://192.168.1.10:502``.
+
+    Args:
+        * port: The port name, ``tcp://host:port``.
+        * timeout: Read timeout value in seconds.
+        * baudrate: Not used.
+        * connect_timeout: Timeout for establishing the connection, in seconds.
+        * pipeline_depth: See :attr:`pipeline_depth`.
+
+    Raises:
+        TypeError, ValueError
+    """
+
+    _scheme = _SCHEME_MODBUS_TCP
+
+    def __init__(
+        self,
+        port: str,
+        timeout: float = 1.0,
+        baudrate: int = 19200,
+        connect_timeout: float = 3.0,
+        pipeline_depth: int = 1,
+    ) -> None:
+        _check_int(pipeline_depth, minvalue=1, description="pipeline depth")
+        self.pipeline_depth = pipeline_depth
+        """Maximum number of outstanding requests in :meth:`.Instrument.transact_many`.
+
+        Many gateways handle only one request at a time, so the default is 1.
+        """
+
+        self._transaction_id = 0
+        self._outstanding: collections.deque[int] = collections.deque()
+        self._responses: Dict[int, bytes] = {}  # Key: transaction identifier
+        super().__init__(port, timeout, baudrate, connect_timeout)
+
+    @property
+    def minimum_silent_period(self) -> float:
+        """The frames are delimited by the MBAP header, so no silent period."""
+        return 0.0
+
+    def open(self) -> None:
+        """Establish the connection, forgetting any outstanding requests.
+
+        Raises:
+            serial.SerialException
+        """
+        self._outstanding.clear()
+        self._responses.clear()
+        super().open()
+
+    def write(self, data: bytes) -> int:
+        """Send an RTU request frame as a Modbus TCP request.
+
+        Raises:
+            serial.SerialException
+        """
+        self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+        pdu = memoryview(data)[1:-_NUMBER_OF_CRC_BYTES]
+        header = _get_struct(">HHHB").pack(
+            self._transaction_id, _MBAP_PROTOCOL_ID, len(pdu) + 1, data[0]
+        )
+        self._send(header + pdu)
+        self._outstanding.append(self._transaction_id)
+        return len(data)
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        """Receive the response to the oldest outstanding request, as an RTU frame.
+
+        Returns:
+            The number of bytes put into *buffer*. The rest of the frame is
+            discarded if it does not fit.
+
+        Raises:
+            serial.SerialException
+        """
+        frame = self._receive_response()
+        number_of_bytes = min(len(frame), len(buffer))
+        buffer[:number_of_bytes] = frame[:number_of_bytes]
+        return number_of_bytes
+
+    def read(self, size: int = 1) -> bytes:
+        """Receive the response to the oldest outstanding request, as an RTU frame.
+
+        Raises:
+            serial.SerialException
+        """
+        return self._receive_response()[:size]
+
+    def reset_input_buffer(self) -> None:
+        """Discard received data, and responses to outstanding requests."""
+        self._outstanding.clear()
+        self._responses.clear()
+        super().reset_input_buffer()
+
+    def _receive_response(self) -> bytes:
+        """Receive the response to the oldest outstanding request.
+
+        Returns:
+            The RTU frame, or empty bytes on timeout.
+
+        Raises:
+            serial.SerialException
+        """
+        if not self._outstanding:
+            return b""
+        transaction_id = self._outstanding[0]
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while transaction_id not in self._responses:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if (remaining is not None and remaining <= 0) or self._socket is None:
+                self._outstanding.popleft()
+                return b""
+            self._receive_mbap_frame(remaining)
+        self._outstanding.popleft()
+        return self._responses.pop(transaction_id)
+
+    def _receive_mbap_frame(self, timeout: Optional[float]) -> None:
+        """Receive one Modbus TCP frame, and store it as an RTU frame.
+
+        Frames for transactions that are not outstanding are discarded. The
+        connection is closed if the byte stream is out of sync.
+
+        Raises:
+            serial.SerialException
+        """
+        header = bytearray(_MBAP_HEADER_LENGTH)
+        number_of_bytes = self._receive_into(memoryview(header), timeout)
+        if number_of_bytes == 0:
+            return
+        if number_of_bytes < _MBAP_HEADER_LENGTH:
+            self.close()
+            return
+
+        transaction_id, protocol_id, length, unit_id = _get_struct(">HHHB").unpack(
+            header
+        )
+        if protocol_id != _MBAP_PROTOCOL_ID or not 2 <= length <= 254:
+            self.close()
+            raise serial.SerialException(
+                "Invalid Modbus TCP header from {}: {!r}".format(
+                    self.port, bytes(header)
+                )
+            )
+
+        frame = bytearray(length + _NUMBER_OF_CRC_BYTES)
+        frame[0] = unit_id
+        view = memoryview(frame)
+        if self._receive_into(view[1:length], self.timeout) < length - 1:
+            self.close()
+            return
+        if transaction_id in self._outstanding:
+            frame[length:] = _calculate_crc(view[:length])
+            self._responses[transaction_id] = bytes(frame)
+
+
+class SimulatedSlave:
+    """Simulated Modbus slave, for testing and benchmarking with :class:`LoopbackPort`.
+
+    Supports the function codes 1, 2, 3, 4, 5, 6, 15 and 16. Other function codes
+    get an "illegal function" exception response, and requests outside the tables
+    get an "illegal data address" exception response.
+
+    Args:
+        * number_of_registers: The size of each table.
+
+    Attributes:
+        * holding_registers (bytearray): Two bytes per register, big endian.
+        * input_registers (bytearray): Two bytes per register, big endian.
+        * coils (bytearray): One byte per bit, 0 or 1.
+        * discrete_inputs (bytearray): One byte per bit, 0 or 1.
+        * exception_code (int): If not 0, all requests get an exception response
+          with this exception code, for example 6 for "slave device busy".
+        * number_of_requests (int): Number of requests handled.
+    """
+
+    def __init__(self, number_of_registers: int = 0x10000) -> None:
+        _check_int(
+            number_of_registers,
+            minvalue=1,
+            maxvalue=0x10000,
+            description="number of registers",
+        )
+        self.holding_registers = bytearray(2 * number_of_registers)
+        self.input_registers = bytearray(2 * number_of_registers)
+        self.coils = bytearray(number_of_registers)
+        self.discrete_inputs = bytearray(number_of_registers)
+        self.exception_code = 0
+        self.number_of_requests = 0
+
+    def set_registers(
+        self, registeraddress: int, values: List[int], functioncode: int = 3
+    ) -> None:
+        """Set the content of holding registers or input registers.
+
+        Args:
+            * registeraddress: The register start address.
+            * values: The unsigned 16-bit values.
+            * functioncode: 3 for holding registers, 4 for input registers.
+
+        Raises:
+            TypeError, ValueError
+        """
+        _check_functioncode(functioncode, [3, 4])
+        table = self.holding_registers if functioncode == 3 else self.input_registers
+        _check_registeraddress(registeraddress)
+        number_of_registers = len(table) // 2
+        if registeraddress + len(values) > number_of_registers:
+            raise ValueError(
+                "The values do not fit in the table of {} registers. ".format(
+                    number_of_registers
+                )
+                + "Given address {!r} and {} values".format(
+                    registeraddress, len(values)
+                )
+            )
+        data = _get_struct(">{}H".format(len(values))).pack(*values)
+        table[2 * registeraddress : 2 * registeraddress + len(data)] = data
+
+    def handle_request(self, pdu: bytes) -> bytes:
+        """Process a request.
+
+        Args:
+            pdu: The function code and the data of the request.
+
+        Returns:
+            The function code and the data of the response.
+        """
+        ILLEGAL_FUNCTION = 1
+        ILLEGAL_DATA_ADDRESS = 2
+        ILLEGAL_DATA_VALUE = 3
+
+        self.number_of_requests += 1
+        functioncode = pdu[0]
+        exception_code = self.exception_code
+        header = _get_struct(">HH")
+        try:
+            address, count = header.unpack_from(pdu, 1)
+        except struct.error:
+            return bytes((functioncode | 0x80, ILLEGAL_DATA_VALUE))
+
+        if exception_code:
+            pass
+        elif functioncode in (3, 4):
+            table = (
+                self.holding_registers if functioncode == 3 else self.input_registers
+            )
+            end = 2 * (address + count)
+            if not 1 <= count <= _MAX_NUMBER_OF_REGISTERS_TO_READ:
+                exception_code = ILLEGAL_DATA_VALUE
+            elif end > len(table):
+                exception_code = ILLEGAL_DATA_ADDRESS
+            else:
+                return bytes((functioncode, 2 * count)) + table[2 * address : end]
+        elif functioncode in (1, 2):
+            table = self.coils if functioncode == 1 else self.discrete_inputs
+            if not 1 <= count <= _MAX_NUMBER_OF_BITS_TO_READ:
+                exception_code = ILLEGAL_DATA_VALUE
+            elif address + count > len(table):
+                exception_code = ILLEGAL_DATA_ADDRESS
+            else:
+                data = _bits_to_bytes(list(table[address : address + count]))
+                return bytes((functioncode, len(data))) + data
+        elif functioncode == 5:
+            if count not in (0x0000, 0xFF00):
+                exception_code = ILLEGAL_DATA_VALUE
+            elif address >= len(self.coils):
+                exception_code = ILLEGAL_DATA_ADDRESS
+            else:
+                self.coils[address] = 1 if count else 0
+                return bytes(pdu[:5])
+        elif functioncode == 6:
+            if 2 * address + 2 > len(self.holding_registers):
+                exception_code = ILLEGAL_DATA_ADDRESS
+            else:
+                self.holding_registers[2 * address : 2 * address + 2] = pdu[3:5]
+                return bytes(pdu[:5])
+        elif functioncode in (15, 16):
+            if len(pdu) < 6:  # No byte count
+                return bytes((functioncode | 0x80, ILLEGAL_DATA_VALUE))
+            data = pdu[6:]
+            if functioncode == 15:
+                table = self.coils
+                end = address + count
+                valid = (
+                    len(data) == pdu[5] == _calculate_number_of_bytes_for_bits(count)
+                )
+            else:
+                table = self.holding_registers
+                end = 2 * (address + count)
+                valid = len(data) == pdu[5] == 2 * count
+            if not valid or count == 0:
+                exception_code = ILLEGAL_DATA_VALUE
+            elif end > len(table):
+                exception_code = ILLEGAL_DATA_ADDRESS
+            else:
+                if functioncode == 15:
+                    table[address:end] = bytes(_bytes_to_bits(data, count))
+                else:
+                    table[2 * address : end] = data
+                return bytes(pdu[:5])
+        else:
+            exception_code = ILLEGAL_FUNCTION
+
+        return bytes((functioncode | 0x80, exception_code))
+
+
+class LoopbackPort(Transport):
+    """In-memory transport connected to simulated slaves.
+
+    The responses are available immediately after each request, so the protocol
+    handling can be tested and benchmarked without any hardware or waiting. Both
+    Modbus RTU and Modbus ASCII requests are answered. Requests with a wrong
+    checksum, or to missing slaves, get no response.
+
+    Pass an instance to :class:`.Instrument` instead of a serial port name.
+
+    Args:
+        * slaves: The simulated slaves, by slave address.
+        * port: The port name. Defaults to a unique ``loopback://`` name.
+        * timeout: Not used, as there is never anything to wait for.
+        * baudrate: Not used.
+    """
+
+    def __init__(
+        self,
+        slaves: Dict[int, SimulatedSlave],
+        port: Optional[str] = None,
+        timeout: Optional[float] = 0.05,
+        baudrate: int = 19200,
+    ) -> None:
+        if port is None:
+            port = "{}{:x}".format(_SCHEME_LOOPBACK, id(self))
+        super().__init__(port, timeout, baudrate)
+        self.slaves = slaves
+        self._is_open = True
+        self._received = bytearray()
+
+    @property
+    def minimum_silent_period(self) -> float:
+        """No silent period."""
+        return 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the port is open."""
+        return self._is_open
+
+    def open(self) -> None:
+        """Open the port."""
+        self._is_open = True
+
+    def close(self) -> None:
+        """Close the port."""
+        self._is_open = False
+
+    def write(self, data: bytes) -> int:
+        """Deliver a request to the simulated slaves, and queue the response.
+
+        Raises:
+            serial.SerialException
+        """
+        if not self._is_open:
+            raise serial.SerialException("Port {} is not open".format(self.port))
+
+        if data[:1] == _ASCII_HEADER:
+            try:
+                frame = _hexdecode(bytes(data[1 : -len(_ASCII_FOOTER)]))
+            except (TypeError, ValueError):
+                return len(data)
+            if len(frame) < 3 or _calculate_lrc(frame[:-1]) != frame[-1:]:
+                return len(data)
+            slaveaddress, pdu = frame[0], frame[1:-1]
+        else:
+            if len(data) < 4 or not _check_crc_frame(data):
+                return len(data)
+            slaveaddress, pdu = data[0], bytes(data[1:-_NUMBER_OF_CRC_BYTES])
+
+        if slaveaddress == _SLAVEADDRESS_BROADCAST:
+            for receiver in self.slaves.values():
+                receiver.handle_request(pdu)
+            return len(data)
+        slave = self.slaves.get(slaveaddress)
+        if slave is None:
+            return len(data)
+
+        response = bytes((slaveaddress,)) + slave.handle_request(pdu)
+        if data[:1] == _ASCII_HEADER:
+            self._received += (
+                _ASCII_HEADER
+                + _hexencode(response)
+                + _hexencode(_calculate_lrc(response))
+                + _ASCII_FOOTER
+            )
+        else:
+            self._received += response + _calculate_crc(response)
+        return len(data)
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        """Receive queued response bytes into *buffer*.
+
+        Returns:
+            The number of bytes received.
+        """
+        number_of_bytes = min(len(buffer), len(self._received))
+        buffer[:number_of_bytes] = self._received[:number_of_bytes]
+        del self._received[:number_of_bytes]
+        return number_of_bytes
+
+    @property
+    def in_waiting(self) -> int:
+        """Number of queued response bytes."""
+        return len(self._received)
+
+    def reset_input_buffer(self) -> None:
+        """Discard queued response bytes."""
+        self._received.clear()
+
+
+def _parse_socket_port(port: str, scheme: str) -> Tuple[str, int]:
+    """Split a socket port name like ``tcp://host:502`` into host and TCP port.
+
+    Args:
+        * port: The port name.
+        * scheme: The expected scheme, including ``://``.
+
+    Returns:
+        The host name and the TCP port number.
+
+    Raises:
+        TypeError, ValueError
+    """
+    _check_string(port, description="port name")
+    if not port.startswith(scheme):
+        raise ValueError(
+            "The port name should start with {!r}. Given: {!r}".format(scheme, port)
+        )
+    host, separator, tcp_port = port[len(scheme) :].rpartition(":")
+    if not separator or not host or not tcp_port.isdigit():
+        raise ValueError(
+            "The port name should be like {}host:port. Given: {!r}".format(scheme, port)
+        )
+    tcp_port_number = int(tcp_port)
+    _check_int(tcp_port_number, minvalue=1, maxvalue=65535, description="TCP port")
+    return host.strip("[]"), tcp_port_number
+
+
+def _is_socket_port_name(port: str) -> bool:
+    """Check if a port name is for one of the socket ports."""
+    return port.startswith((_SCHEME_RTU_OVER_TCP, _SCHEME_MODBUS_TCP))
+
+
+def _create_socket_port(port: str) -> RtuOverTcpPort:
+    """Create a socket port from a port name like ``rtu+tcp://host:502``.
+
+    Raises:
+        TypeError, ValueError, serial.SerialException
+    """
+    if port.startswith(_SCHEME_RTU_OVER_TCP):
+        return RtuOverTcpPort(port)
+    return ModbusTcpPort(port)
+
+
+# ############# #
+# Read planning #
+# ############# #
+
+
+def plan_register_reads(
+    wanted: Dict[int, Iterable[int]],
+    baudrate: Union[int, float] = 19200,
+    transaction_overhead: float = 0.005,
+    functioncode: int = 3,
+    mode: str = MODE_RTU,
+    max_block_size: Optional[int] = None,
+    unreadable: Optional[Dict[int, Iterable[int]]] = None,
+) -> List[Tuple[int, int, int, int]]:
+    """Plan the block reads that get the wanted registers in the shortest time.
+
+    Reading a few unwanted registers between the wanted ones is often faster than
+    an additional transaction. The plan has the minimum estimated bus time, where
+    each transaction costs the request and response frames at the baudrate, two
+    silent periods and the *transaction_overhead*.
+
+    Args:
+        * wanted: The wanted register (or bit) addresses, by slave address.
+        * baudrate: Baudrate of the bus, in Baud.
+        * transaction_overhead: Additional time per transaction in seconds, for
+          example the response delay of the slaves.
+        * functioncode: Modbus function code, 1 to 4.
+        * mode: :data:`MODE_RTU` or :data:`MODE_ASCII`.
+        * max_block_size: Maximum number of registers (or bits) per read.
+          Defaults to the Modbus limit, 125 registers or 2000 bits.
+        * unreadable: Addresses that must not be read, by slave address. For
+          example registers that are not implemented in the slave, and make it
+          respond with an exception.
+
+    Returns:
+        A list of (slaveaddress, functioncode, registeraddress, number_of_items)
+        tuples, in the format used by :meth:`Instrument.transact_many`. Sorted by
+        slave address in the order of *wanted*, and then by register address.
+
+    Raises:
+        TypeError, ValueError
+
+    Use :func:`execute_read_plan` to perform the reads.
+    """
+    _check_functioncode(functioncode, [1, 2, 3, 4])
+    _check_mode(mode)
+    _check_numerical(baudrate, minvalue=1, description="baudrate")
+    _check_numerical(
+        transaction_overhead, minvalue=0, description="transaction overhead"
+    )
+    reads_bits = functioncode in [1, 2]
+    limit = (
+        _MAX_NUMBER_OF_BITS_TO_READ if reads_bits else _MAX_NUMBER_OF_REGISTERS_TO_READ
+    )
+    if max_block_size is None:
+        max_block_size = limit
+    _check_int(max_block_size, minvalue=1, maxvalue=limit, description="block size")
+    if unreadable is None:
+        unreadable = {}
+
+    # Bus time for a block read of n items is fixed_cost + n * item_cost, except
+    # for bits which are rounded up to whole bytes.
+    REQUEST_LENGTH_RTU = 8
+    RESPONSE_OVERHEAD_RTU = 5
+    charactertime = _BITTIMES_PER_CHARACTERTIME / float(baudrate)
+    characters_per_byte = 2 if mode == MODE_ASCII else 1
+    frame_overhead = 1 if mode == MODE_ASCII else 0  # Per frame, beyond the bytes
+    fixed_cost = (
+        transaction_overhead
+        + 2 * _calculate_minimum_silent_period(baudrate)
+        + charactertime
+        * (
+            characters_per_byte * (REQUEST_LENGTH_RTU + RESPONSE_OVERHEAD_RTU)
+            + 2 * frame_overhead
+        )
+    )
+
+    def block_cost(number_of_items: int) -> float:
+        if reads_bits:
+            number_of_bytes = _calculate_number_of_bytes_for_bits(number_of_items)
+        else:
+            number_of_bytes = 2 * number_of_items
+        return fixed_cost + charactertime * characters_per_byte * number_of_bytes
+
+    plan: List[Tuple[int, int, int, int]] = []
+    for slaveaddress, addresses in wanted.items():
+        _check_slaveaddress(slaveaddress)
+        wanted_addresses = sorted(set(addresses))
+        for address in wanted_addresses:
+            _check_registeraddress(address)
+        holes = sorted(set(unreadable.get(slaveaddress, [])))
+        for address in holes:
+            _check_registeraddress(address)
+        for address in set(wanted_addresses).intersection(holes):
+            raise ValueError(
+                "The address {} of slave {} is both wanted and unreadable".format(
+                    address, slaveaddress
+                )
+            )
+
+        # Dynamic programming over the sorted addresses: best_costs[j] is the
+        # minimum cost to read the first j addresses, where the last block
+        # starts at wanted_addresses[block_starts[j]].
+        number_of_addresses = len(wanted_addresses)
+        best_costs = [0.0] * (number_of_addresses + 1)
+        block_starts = [0] * (number_of_addresses + 1)
+        for end_index in range(number_of_addresses):
+            last_address = wanted_addresses[end_index]
+            hole_index = bisect.bisect_left(holes, last_address)
+            nearest_hole = holes[hole_index - 1] if hole_index else -1
+            best_cost = float("inf")
+            best_start = end_index
+            start_index = end_index
+            while start_index >= 0:
+                first_address = wanted_addresses[start_index]
+                number_of_items = last_address - first_address + 1
+                if number_of_items > max_block_size or first_address <= nearest_hole:
+                    break
+                cost = best_costs[start_index] + block_cost(number_of_items)
+                if cost < best_cost:
+                    best_cost = cost
+                    best_start = start_index
+                start_index -= 1
+            best_costs[end_index + 1] = best_cost
+            block_starts[end_index + 1] = best_start
+
+        blocks = []
+        end_index = number_of_addresses
+        while end_index > 0:
+            start_index = block_starts[end_index]
+            first_address = wanted_addresses[start_index]
+            number_of_items = wanted_addresses[end_index - 1] - first_address + 1
+            blocks.append((slaveaddress, functioncode, first_address, number_of_items))
+            end_index = start_index
+        plan.extend(reversed(blocks))
+
+    return plan
+
+
+def execute_read_plan(
+    instrument: Instrument, plan: List[Tuple[int, int, int, int]]
+) -> Dict[int, Dict[int, int]]:
+    """Perform the reads of a plan from :func:`plan_register_reads`.
+
+    The reads are done in one :meth:`Instrument.transact_many` sweep.
+
+    Args:
+        * instrument: The instrument whose port is used.
+        * plan: The reads, as (slaveaddress, functioncode, registeraddress,
+          number_of_items) tuples.
+
+    Returns:
+        The values by address, by slave address. The addresses of failed reads are
+        missing, and unwanted addresses that were read to fill gaps are included.
+
+    Raises:
+        TypeError, ModbusException,
+        serial.SerialException (inherited from IOError)
+    """
+    values: Dict[int, Dict[int, int]] = {}
+    for read, result in zip(plan, instrument.transact_many(list(plan))):
+        if isinstance(result, Exception):
+            continue
+        slaveaddress, _, registeraddress, number_of_items = read
+        values.setdefault(slaveaddress, {}).update(
+            zip(range(registeraddress, registeraddress + number_of_items), result)
+        )
+    return values
+
+
+# ############# #
+# Frame parsing #
+# ############# #
+
+
+class RtuFrame:
+    """A complete Modbus RTU frame found by :class:`RtuFrameParser`.
+
+    Args:
+        * frametype: See :attr:`frametype`.
+        * raw: See :attr:`raw`.
+        * timestamp: See :attr:`timestamp`.
+        * request: See :attr:`request`.
+    """
+
+    __slots__ = ("frametype", "raw", "timestamp", "request")
+
+    def __init__(
+        self,
+        frametype: str,
+        raw: bytes,
+        timestamp: float,
+        request: Optional[RtuFrame] = None,
+    ) -> None:
+        self.frametype = frametype
+        """:data:`FRAME_REQUEST`, :data:`FRAME_RESPONSE` or :data:`FRAME_EXCEPTION`."""
+
+        self.raw = raw
+        """The frame, from the slave address to the CRC."""
+
+        self.timestamp = timestamp
+        """When the last byte of the frame was received."""
+
+        self.request = request
+        """For a response, the request it answers if that was received just before.
+        Otherwise :const:`None`."""
+
+    def __repr__(self) -> str:
+        return "{}<frametype={!r}, raw={!r}, timestamp={}>".format(
+            self.__class__.__name__, self.frametype, self.raw, self.timestamp
+        )
+
+    @property
+    def slaveaddress(self) -> int:
+        """The slave address. Read only."""
+        return self.raw[0]
+
+    @property
+    def functioncode(self) -> int:
+        """The function code, without the exception bit. Read only."""
+        return self.raw[1] & 0x7F
+
+    @property
+    def data(self) -> bytes:
+        """The bytes between the function code and the CRC. Read only."""
+        return self.raw[2:-2]
+
+
+class RtuFrameParser:
+    """Find Modbus RTU frames in a stream of bytes, for example from a bus sniffer.
+
+    The bytes can be fed in chunks of any size. The frame length is calculated from
+    the function code and the byte count, and the CRC tells which of the possible
+    lengths (request or response) is right. When no frame with a correct CRC starts
+    at a byte, the byte is dropped, so the parser resynchronizes after noise.
+
+    A response is recognized when it follows the request it answers, otherwise
+    the request length is tried first. The function codes 1-6, 8, 15, 16, 22
+    and 23 are supported, plus exception responses.
+
+    Args:
+        frame_timeout: If there are no bytes for this long (in seconds), the
+            frame in progress is ended: the complete frames in the buffer are
+            returned and the remaining bytes are dropped. It should be 3.5
+            character times, or more for adaptors that deliver bytes in chunks
+            (often 10-20 ms for USB adaptors). :const:`None` for no timeout, which
+            can delay a frame until the next frames arrive after a CRC error.
+
+    Example::
+
+        parser = minimalmodbus.RtuFrameParser(frame_timeout=0.02)
+        for frame in parser.feed(serialport.read(serialport.in_waiting or 1)):
+            if frame.frametype == minimalmodbus.FRAME_RESPONSE:
+                print(frame.request, frame.data)
+    """
+
+    def __init__(self, frame_timeout: Optional[float] = None) -> None:
+        self.frame_timeout = frame_timeout
+        """The frame timeout in seconds, see the class documentation."""
+
+        self.number_of_frames = 0
+        """Number of frames found."""
+
+        self.dropped_bytes = 0
+        """Number of bytes that were not part of a frame with a correct CRC."""
+
+        self._buffer = bytearray()
+        self._latest_timestamp = 0.0
+        self._pending_request: Optional[RtuFrame] = None
+
+    def __repr__(self) -> str:
+        return "{}<frame_timeout={}, number_of_frames={}, dropped_bytes={}>".format(
+            self.__class__.__name__,
+            self.frame_timeout,
+            self.number_of_frames,
+            self.dropped_bytes,
+        )
+
+    def feed(
+        self,
+        chunk: Union[bytes, bytearray, memoryview],
+        timestamp: Optional[float] = None,
+    ) -> List[RtuFrame]:
+        """Parse received bytes.
+
+        Args:
+            * chunk: The received bytes.
+            * timestamp: When the bytes were received, in seconds. Defaults to
+              :func:`time.monotonic`. Used for the frame timeout, and given to the
+              frames.
+
+        Returns:
+            The frames completed by the chunk (or ended by the frame timeout).
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        frames: List[RtuFrame] = []
+        if (
+            self._buffer
+            and self.frame_timeout is not None
+            and timestamp - self._latest_timestamp > self.frame_timeout
+        ):
+            self._parse(frames, self._latest_timestamp, True)
+        self._latest_timestamp = timestamp
+        self._buffer += chunk
+        self._parse(frames, timestamp, False)
+        return frames
+
+    def flush(self) -> List[RtuFrame]:
+        """End the frame in progress, for example after a frame timeout without
+        any new bytes.
+
+        Returns:
+            The complete frames in the buffer. The remaining bytes are dropped.
+        """
+        frames: List[RtuFrame] = []
+        if self._buffer:
+            self._parse(frames, self._latest_timestamp, True)
+        return frames
+
+    def _parse(self, frames: List[RtuFrame], timestamp: float, final: bool) -> None:
+        """Find the frames in the buffer.
+
+        Args:
+            * frames: The found frames are appended to this list.
+            * timestamp: For the found frames.
+            * final: :const:`True` if no more bytes will be added to the frame in
+              progress.
+        """
+        buffer = self._buffer
+        view = memoryview(buffer)
+        start = 0
+        try:
+            while len(buffer) - start >= _NUMBER_OF_BYTES_IN_EXCEPTION_RESPONSE:
+                candidates = self._get_candidates(view, start)
+                available = len(buffer) - start
+                for length, frametype in candidates:
+                    if length is not None and length > _MAX_RTU_FRAME_LENGTH:
+                        continue
+                    if length is None or length > available:
+                        if final:
+                            continue
+                        return  # Wait for more bytes
+                    if _crc16(view[start : start + length]) != 0:
+                        continue
+                    if frametype == FRAME_RESPONSE and not self._may_be_response(
+                        view[start : start + length]
+                    ):
+                        continue
+                    frames.append(
+                        self._create_frame(
+                            frametype, bytes(view[start : start + length]), timestamp
+                        )
+                    )
+                    start += length
+                    break
+                else:
+                    start += 1  # Resynchronize
+                    self.dropped_bytes += 1
+        finally:
+            view.release()
+            if final:
+                self.dropped_bytes += len(buffer) - start
+                start = len(buffer)
+            del buffer[:start]
+
+    def _get_candidates(
+        self, view: memoryview, start: int
+    ) -> List[Tuple[Optional[int], str]]:
+        """Return the possible frames starting at a position in the buffer.
+
+        Args:
+            * view: The buffer, with at least 5 bytes from the start position.
+            * start: The position in the buffer.
+
+        Returns:
+            The frame lengths and frame types, in the order to try them. The length
+            is :const:`None` if it depends on bytes not received yet.
+        """
+        slaveaddress = view[start]
+        functioncode = view[start + 1]
+        if slaveaddress > _MAX_SLAVEADDRESS:
+            return []
+
+        pending_request = self._pending_request
+        answers_request = (
+            pending_request is not None
+            and pending_request.raw[0] == slaveaddress
+            and pending_request.raw[1] == functioncode & 0x7F
+        )
+        if functioncode & 0x80:
+            return [(_NUMBER_OF_BYTES_IN_EXCEPTION_RESPONSE, FRAME_EXCEPTION)]
+
+        available = len(view) - start
+        request_length: Optional[int]
+        response_length: Optional[int]
+        if functioncode in (1, 2, 3, 4):
+            request_length = 8
+            response_length = 5 + view[start + 2]
+        elif functioncode in (5, 6, 8):
+            request_length = response_length = 8
+        elif functioncode in (15, 16):
+            request_length = 9 + view[start + 6] if available > 6 else None
+            response_length = 8
+        elif functioncode == 22:
+            request_length = response_length = 10
+        elif functioncode == 23:
+            request_length = 13 + view[start + 10] if available > 10 else None
+            response_length = 5 + view[start + 2]
+        else:
+            return []
+
+        if answers_request:
+            return [(response_length, FRAME_RESPONSE), (request_length, FRAME_REQUEST)]
+        return [(request_length, FRAME_REQUEST), (response_length, FRAME_RESPONSE)]
+
+    def _may_be_response(self, raw: memoryview) -> bool:
+        """Check that a frame is consistent with the request waiting for a response.
+
+        This tells a response from a request of the same length, for example when a
+        response was lost.
+
+        Args:
+            raw: The frame, with a correct CRC.
+
+        Returns:
+            :const:`False` if the frame can not answer the waiting request of the
+            same slave and function code.
+        """
+        request = self._pending_request
+        if request is None or request.raw[:2] != raw[:2]:
+            return True
+        functioncode = raw[1]
+        requested = request.raw
+        if functioncode in (1, 2):
+            number_of_bits = requested[4] << 8 | requested[5]
+            return raw[2] == (number_of_bits + 7) // _BITS_PER_BYTE
+        if functioncode in (3, 4, 23):
+            number_of_registers = requested[4] << 8 | requested[5]
+            return raw[2] == number_of_registers * _NUMBER_OF_BYTES_PER_REGISTER
+        if functioncode in (15, 16):
+            return raw[2:6] == requested[2:6]
+        return raw == requested  # Echo
+
+    def _create_frame(self, frametype: str, raw: bytes, timestamp: float) -> RtuFrame:
+        """Create a found frame, and keep track of the request waiting for a response.
+
+        Args:
+            * frametype: The frame type.
+            * raw: The frame.
+            * timestamp: When the frame was received.
+        """
+        self.number_of_frames += 1
+        if frametype == FRAME_REQUEST:
+            frame = RtuFrame(frametype, raw, timestamp)
+            if raw[0] != _SLAVEADDRESS_BROADCAST:
+                self._pending_request = frame
+            return frame
+        request = self._pending_request
+        self._pending_request = None
+        if request is not None and (
+            request.raw[0] != raw[0] or request.raw[1] != raw[1] & 0x7F
+        ):
+            request = None
+        return RtuFrame(frametype, raw, timestamp, request)
+
+
+# ########## #
+# Port state #
+# ########## #
+
+
+class _PortTiming:
+    """Timing parameters of a port, calculated once for its baudrate.
+
+    Args:
+        * baudrate: The baudrate of the port.
+        * minimum_silent_period: See :func:`_get_minimum_silent_period`.
+    """
+
+    def __init__(self, baudrate: Union[int, float], minimum_silent_period: float):
+        self.baudrate = baudrate
+        self.minimum_silent_period = minimum_silent_period
+        self.character_time = _BITTIMES_PER_CHARACTERTIME / float(baudrate)
+
+    def frame_time(self, number_of_bytes: int) -> float:
+        """Return the time to transfer a frame on the bus, in seconds.
+
+        Args:
+            number_of_bytes: The frame length, in bytes (characters for ASCII mode).
+        """
+        return number_of_bytes * self.character_time
+
+
+class _PortLock:
+    """Serialize the transactions on a serial port, and keep contention statistics.
+
+    The lock is reentrant, so a thread can hold it over a sequence of transactions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.acquisitions = 0
+        self.contentions = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def __enter__(self) -> _PortLock:
+        if not self._lock.acquire(blocking=False):
+            start_time = time.monotonic()
+            self._lock.acquire()
+            wait_time = time.monotonic() - start_time
+            self.contentions += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+        self.acquisitions += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._lock.release()
+
+    @property
+    def uncounted(self) -> threading.RLock:
+        """The underlying lock, for holders not counted in the statistics."""
+        return self._lock
+
+    def get_statistics(self) -> Dict[str, float]:
+        """Return the contention statistics."""
+        return {
+            "acquisitions": self.acquisitions,
+            "contentions": self.contentions,
+            "wait_time": self.wait_time,
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+class _IdleCloser:
+    """Close a port when it has been idle, see :attr:`Instrument.close_port_after_idle`.
+
+    There is at most one timer thread per port, which is restarted only when the port
+    has been in use while it was waiting.
+
+    Args:
+        lock: The lock of the port, held by the timer thread when closing it.
+    """
+
+    def __init__(self, lock: _PortLock) -> None:
+        self._lock = lock
+        self._idle_timer: Optional[threading.Timer] = None
+        self._idle_port: Any = None
+        self._idle_time = 0.0
+        self._latest_use = 0.0
+
+    def schedule(self, serialport: Any, idle_time: float) -> None:
+        """Close the port when it has not been used for *idle_time* seconds.
+
+        Call it with the port lock held, after each transaction.
+
+        Args:
+            * serialport: The port to close.
+            * idle_time: The idle time in seconds.
+        """
+        self._idle_port = serialport
+        self._idle_time = idle_time
+        self._latest_use = time.monotonic()
+        if self._idle_timer is None:
+            self._start_idle_timer(idle_time)
+
+    def cancel(self) -> None:
+        """Stop the idle timer. Call it with the port lock held."""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _start_idle_timer(self, delay: float) -> None:
+        """Start the idle timer thread."""
+        timer = threading.Timer(delay, self._close_if_idle)
+        timer.daemon = True
+        self._idle_timer = timer
+        timer.start()
+
+    def _close_if_idle(self) -> None:
+        """Close the port if it is idle, otherwise wait for the rest of the idle time.
+
+        Runs in the idle timer thread.
+        """
+        with self._lock.uncounted:
+            if self._idle_timer is not threading.current_thread():
+                return  # Cancelled while waiting for the lock
+            self._idle_timer = None
+            remaining_time = self._latest_use + self._idle_time - time.monotonic()
+            if remaining_time > 0:
+                self._start_idle_timer(remaining_time)
+            elif self._idle_port.is_open:
+                self._idle_port.close()
+
+
+class _SilentPeriodWaiter:
+    """Wait for the silent period with little oversleeping, and keep statistics."""
+
+    def __init__(self) -> None:
+        # Busy waiting on a single processor only delays the other processes,
+        # and the scheduler then wakes this one up later
+        self.max_spin_time = _MAX_SPIN_TIME if (os.cpu_count() or 1) > 1 else 0.0
+        self.spin_time = min(_INITIAL_SPIN_TIME, self.max_spin_time)
+        self.sleeps = 0
+        self.oversleep_time = 0.0
+        self.max_oversleep_time = 0.0
+
+    def wait_until(self, deadline: float) -> None:
+        """Wait until the deadline, which is a :func:`time.monotonic` timestamp.
+
+        A plain :func:`time.sleep` often oversleeps by milliseconds on a loaded
+        system, which is as long as the silent period itself. So this sleeps until
+        shortly before the deadline, and then busy-waits for the rest. The busy wait
+        is as long as the longest recent oversleep, at most 5 ms. There is no busy
+        wait on single processor systems.
+
+        Args:
+            deadline: The time to wait for.
+        """
+        sleep_time = deadline - self.spin_time - time.monotonic()
+        if sleep_time > 0:
+            wakeup_time = time.monotonic() + sleep_time
+            time.sleep(sleep_time)
+            oversleep_time = max(time.monotonic() - wakeup_time, 0.0)
+            self.sleeps += 1
+            self.oversleep_time += oversleep_time
+            self.max_oversleep_time = max(self.max_oversleep_time, oversleep_time)
+            self.spin_time = min(
+                max(oversleep_time, self.spin_time * _OVERSLEEP_DECAY),
+                self.max_spin_time,
+            )
+        while time.monotonic() < deadline:
+            pass
+
+    def get_statistics(self) -> Dict[str, float]:
+        """Return the sleep statistics."""
+        return {
+            "sleeps": self.sleeps,
+            "oversleep_time": self.oversleep_time,
+            "max_oversleep_time": self.max_oversleep_time,
+        }
+
+
+class _ResponseTimes:
+    """Response latency measurements, see :attr:`Instrument.adaptive_timeout`.
+
+    Also remembers the timeout set by the user, to tell it from the adapted one.
+    """
+
+    def __init__(self) -> None:
+        self.response_latency = 0.0
+        self.latency_samples = 0
+        self.max_response_length = 0
+        self.configured_timeout: Optional[float] = None
+        self.adapted_timeout: Optional[float] = None
+        self.timeout_adapted = False
+
+    def record(
+        self,
+        timing: _PortTiming,
+        request_length: int,
+        response_length: int,
+        expected_length: int,
+        roundtrip_time: float,
+    ) -> None:
+        """Measure the response latency of a transaction.
+
+        Args:
+            * timing: The timing parameters of the port.
+            * request_length: Number of bytes written.
+            * response_length: Number of bytes read, not counting any local echo.
+            * expected_length: Number of bytes that should have been read.
+            * roundtrip_time: Time from writing to the end of reading, in seconds.
+        """
+        if expected_length == 0:
+            return
+        if response_length < expected_length:
+            self.latency_samples = 0  # Measure again before adapting the timeout
+            return
+        latency = roundtrip_time - timing.frame_time(request_length + response_length)
+        self.response_latency = max(latency, self.response_latency * _LATENCY_DECAY)
+        self.latency_samples += 1
+        self.max_response_length = max(self.max_response_length, expected_length)
+
+
+class _BusStatistics:
+    """Bus occupancy, noise and other master statistics of a port."""
+
+    def __init__(self) -> None:
+        self._created = time.monotonic()
+        self.bus_time = 0.0
+        self.noise_events = 0
+        self.noise_bytes = 0
+        self.bus_busy_events = 0
+        self.bus_busy_errors = 0
+
+    def get_statistics(self) -> Dict[str, float]:
+        """Return the statistics."""
+        elapsed_time = time.monotonic() - self._created
+        return {
+            "bus_time": self.bus_time,
+            "bus_utilization": self.bus_time / elapsed_time if elapsed_time else 0.0,
+            "noise_events": self.noise_events,
+            "noise_bytes": self.noise_bytes,
+            "bus_busy_events": self.bus_busy_events,
+            "bus_busy_errors": self.bus_busy_errors,
+        }
+
+
+class _PortState:
+    """The per-port state, shared by all instruments using the port.
+
+    Change it with :attr:`lock` held. The timing parameters are calculated again only
+    when the baudrate changes.
+    """
+
+    def __init__(self) -> None:
+        self.lock = _PortLock()
+        self.idle_closer = _IdleCloser(self.lock)
+        self.waiter = _SilentPeriodWaiter()
+        self.response_times = _ResponseTimes()
+        self.bus_statistics = _BusStatistics()
+        self._timing: Optional[_PortTiming] = None
 
-        self._print_debug(
-            "Will write to instrument (expecting {} bytes back): {}".format(
-                number_of_bytes_to_read, _describe_bytes(request)
+    def get_timing(self, serialport: Any) -> _PortTiming:
+        """Return the timing parameters, calculating them again if the baudrate changed.
+
+        Args:
+            serialport: The port, a :class:`Transport` or a pySerial port.
+
+        Raises:
+            TypeError, ValueError
+        """
+        timing = self._timing
+        if timing is None or timing.baudrate != serialport.baudrate:
+            timing = _PortTiming(
+                serialport.baudrate, _get_minimum_silent_period(serialport)
             )
-        )
+            self._timing = timing
+        return timing
 
-        if self.serial is None:
-            raise ModbusException("The serial port instance is None")
+    def record_transaction(
+        self,
+        timing: _PortTiming,
+        request_length: int,
+        response_length: int,
+        expected_length: int,
+        roundtrip_time: float,
+    ) -> None:
+        """Account for the bus time of a transaction, and measure the response latency.
 
-        if not self.serial.is_open:
-            self._print_debug("Opening port {}".format(self.serial.port))
-            self.serial.open()
+        Args:
+            * timing: The timing parameters of the port.
+            * request_length: Number of bytes written.
+            * response_length: Number of bytes read, not counting any local echo.
+            * expected_length: Number of bytes that should have been read.
+            * roundtrip_time: Time from writing to the end of reading, in seconds.
+        """
+        self.bus_statistics.bus_time += roundtrip_time
+        self.response_times.record(
+            timing, request_length, response_length, expected_length, roundtrip_time
+        )
 
-        portname: str = ""
-        if self.serial.port is not None:
-            portname = self.serial.port
+    def get_statistics(self) -> Dict[str, float]:
+        """Return the statistics, see :attr:`Instrument.port_statistics`."""
+        statistics = self.lock.get_statistics()
+        statistics.update(self.bus_statistics.get_statistics())
+        statistics["response_latency"] = self.response_times.response_latency
+        statistics.update(self.waiter.get_statistics())
+        return statistics
 
-        if self.clear_buffers_before_each_transaction:
-            self._print_debug("Clearing serial buffers for port {}".format(portname))
-            self.serial.reset_input_buffer()
-            self.serial.reset_output_buffer()
 
-        # Sleep to make sure 3.5 character times have passed
-        minimum_silent_period = _calculate_minimum_silent_period(self.serial.baudrate)
-        time_since_read = time.monotonic() - _latest_read_times.get(portname, 0)
+def _get_portname(serialport: Union[serial.Serial, Transport]) -> str:
+    """Return the port name, used as key for the per-port module level data.
 
-        if time_since_read < minimum_silent_period:
-            sleep_time = minimum_silent_period - time_since_read
+    Args:
+        serialport: The serial port object.
+    """
+    if serialport.port is not None:
+        return str(serialport.port)
+    return ""
 
-            if self.debug:
-                template = (
-                    "Sleeping {:.2f} ms before sending. "
-                    + "Minimum silent period: {:.2f} ms, time since read: {:.2f} ms."
-                )
-                text = template.format(
-                    sleep_time * _SECONDS_TO_MILLISECONDS,
-                    minimum_silent_period * _SECONDS_TO_MILLISECONDS,
-                    time_since_read * _SECONDS_TO_MILLISECONDS,
-                )
-                self._print_debug(text)
 
-            time.sleep(sleep_time)
+def _get_port_state(portname: str) -> _PortState:
+    """Return the state of a port, creating it on first use.
 
-        elif self.debug:
-            template = (
-                "No sleep required before write. Time since "
-                + "previous read: {:.2f} ms, minimum silent period: {:.2f} ms."
-            )
-            text = template.format(
-                time_since_read * _SECONDS_TO_MILLISECONDS,
-                minimum_silent_period * _SECONDS_TO_MILLISECONDS,
-            )
-            self._print_debug(text)
+    Args:
+        portname: The port name, see :func:`_get_portname`.
+    """
+    port = _port_states.get(portname)
+    if port is None:
+        with _registry_lock:
+            port = _port_states.setdefault(portname, _PortState())
+    return port
 
-        # Write request
-        write_time = time.monotonic()
-        self.serial.write(request)
 
-        # Read and discard local echo
-        if self.handle_local_echo:
-            local_echo_to_discard = self.serial.read(len(request))
-            if self.debug:
-                text = "Discarding this local echo: {}".format(
-                    _describe_bytes(local_echo_to_discard),
-                )
-                self._print_debug(text)
-            if local_echo_to_discard != request:
-                template = (
-                    "Local echo handling is enabled, but the local echo does "
-                    + "not match the sent request. "
-                    + "Request: {}, local echo: {}."
-                )
-                text = template.format(
-                    _describe_bytes(request),
-                    _describe_bytes(local_echo_to_discard),
-                )
-                raise LocalEchoError(text)
+# ################### #
+# Request frame cache #
+# ################### #
 
-        # Read response
-        if number_of_bytes_to_read > 0:
-            answer = self.serial.read(number_of_bytes_to_read)
-        else:
-            answer = b""
-            self.serial.flush()
 
-        read_time = time.monotonic()
-        _latest_read_times[portname] = read_time
-        roundtrip_time = read_time - write_time
-        self._latest_roundtrip_time = roundtrip_time
+def _get_request_frame(
+    key: Tuple[int, str, int, int, int],
+) -> Optional[Tuple[bytes, int]]:
+    """Look up a read request in the request frame cache.
 
-        if self.close_port_after_each_call:
-            self._print_debug("Closing port {}".format(portname))
-            self.serial.close()
+    Args:
+        key: Slave address, mode, function code, register address and number of
+            registers (or bits).
 
-        if self.debug:
-            if isinstance(self.serial.timeout, float):
-                timeout_time = self.serial.timeout * _SECONDS_TO_MILLISECONDS
-            else:
-                timeout_time = 0
-            text = (
-                "Response from instrument: {}, roundtrip time: {:.1f} ms."
-                " Timeout for reading: {:.1f} ms.\n"
-            ).format(
-                _describe_bytes(answer),
-                roundtrip_time,
-                timeout_time,
-            )
-            self._print_debug(text)
+    Returns:
+        The raw request and the predicted response size, or :const:`None`.
+    """
+    with _request_frame_cache_lock:
+        frame = _request_frame_cache.get(key)
+        if frame is not None:
+            _request_frame_cache.move_to_end(key)
+    return frame
 
-        if not answer and number_of_bytes_to_read > 0:
-            raise NoResponseError("No communication with the instrument (no answer)")
 
-        if number_of_bytes_to_read == 0:
-            self._print_debug(
-                "Broadcast delay: Sleeping for {} s".format(_BROADCAST_DELAY)
-            )
-            time.sleep(_BROADCAST_DELAY)
+def _store_request_frame(
+    key: Tuple[int, str, int, int, int], frame: Tuple[bytes, int]
+) -> None:
+    """Store a read request in the request frame cache, evicting the oldest entry.
 
-        return answer
+    Args:
+        * key: See :func:`_get_request_frame`.
+        * frame: The raw request and the predicted response size.
+    """
+    with _request_frame_cache_lock:
+        _request_frame_cache[key] = frame
+        if len(_request_frame_cache) > _REQUEST_FRAME_CACHE_SIZE:
+            _request_frame_cache.popitem(last=False)
 
 
 # ########## #
@@ -1576,6 +4325,10 @@ class InvalidResponseError(MasterReportedException):
     """The response does not fulfill the Modbus standad, for example wrong checksum."""
 
 
+class BusBusyError(MasterReportedException):
+    """The bus was busy with traffic from other masters, see listen_before_talk."""
+
+
 # ################ #
 # Payload handling #
 # ################ #
@@ -1787,13 +4540,17 @@ def _embed_payload(
 
 
 def _extract_payload(
-    response: bytes, slaveaddress: int, mode: str, functioncode: int
+    response: Union[bytes, bytearray, memoryview],
+    slaveaddress: int,
+    mode: str,
+    functioncode: int,
 ) -> bytes:
     """Extract the payload data part from the slave's response.
 
     Args:
         * response: The raw response bytes from the slave.
-          This is different for RTU and ASCII.
+          This is different for RTU and ASCII. In RTU mode it is parsed without
+          intermediate copies, so a memoryview of a receive buffer can be given.
         * slaveaddress: The adress of the slave. Used here for error checking only.
         * mode: The modbus protocol mode (MODE_RTU or MODE_ASCII)
         * functioncode: Used here for error checking only.
@@ -1826,11 +4583,14 @@ def _extract_payload(
     MINIMAL_RESPONSE_LENGTH_ASCII = 9
 
     # Argument validity testing (ValueError/TypeError at lib programming error)
-    _check_bytes(response, description="response")
+    if not isinstance(response, (bytes, bytearray, memoryview)):
+        raise TypeError("The response should be bytes. Given: {!r}".format(response))
     _check_slaveaddress(slaveaddress)
     _check_mode(mode)
     _check_functioncode(functioncode, None)
 
+    if mode == MODE_ASCII:
+        response = bytes(response)
     plainresponse = response
 
     # Validate response length
@@ -1846,7 +4606,7 @@ def _extract_payload(
         raise InvalidResponseError(
             "Too short Modbus RTU response (minimum "
             + "length {} bytes). Response: {!r}".format(
-                MINIMAL_RESPONSE_LENGTH_RTU, response
+                MINIMAL_RESPONSE_LENGTH_RTU, bytes(response)
             )
         )
 
@@ -1878,28 +4638,32 @@ def _extract_payload(
                 template.format(len(response), response, plainresponse)
             )
 
-        # Convert the ASCII (stripped) response string to RTU-like response string
-        response = _hexdecode(response)
+        # Convert the ASCII (stripped) response string to RTU-like response string.
+        # It is already bytes, so bytes() only tells the type checker.
+        response = _hexdecode(bytes(response))
 
     # Validate response checksum
     if mode == MODE_ASCII:
-        calculate_checksum = _calculate_lrc
-        number_of_checksum_bytes = NUMBER_OF_LRC_BYTES
+        received_checksum = response[-NUMBER_OF_LRC_BYTES:]
+        calculated_checksum = _calculate_lrc(bytes(response[:-NUMBER_OF_LRC_BYTES]))
+        checksum_ok = received_checksum == calculated_checksum
     else:
-        calculate_checksum = _calculate_crc
-        number_of_checksum_bytes = NUMBER_OF_CRC_BYTES
-
-    received_checksum = response[-number_of_checksum_bytes:]
-    response_without_checksum = response[0 : (len(response) - number_of_checksum_bytes)]
-    calculated_checksum = calculate_checksum(response_without_checksum)
+        checksum_ok = _check_crc_frame(response)
+        if not checksum_ok:
+            received_checksum = response[-NUMBER_OF_CRC_BYTES:]
+            calculated_checksum = _calculate_crc(response[:-NUMBER_OF_CRC_BYTES])
 
-    if received_checksum != calculated_checksum:
+    if not checksum_ok:
         template = (
             "Checksum error in {} mode: {!r} instead of {!r} . The response "
             + "is: {!r} (plain response: {!r})"
         )
         text = template.format(
-            mode, received_checksum, calculated_checksum, response, plainresponse
+            mode,
+            bytes(received_checksum),
+            calculated_checksum,
+            bytes(response),
+            bytes(plainresponse),
         )
         raise InvalidResponseError(text)
 
@@ -1910,7 +4674,7 @@ def _extract_payload(
         raise InvalidResponseError(
             "Wrong return slave "
             + "address: {} instead of {}. The response is: {!r}".format(
-                responseaddress, slaveaddress, response
+                responseaddress, slaveaddress, bytes(response)
             )
         )
 
@@ -1922,7 +4686,7 @@ def _extract_payload(
     if received_functioncode != functioncode:
         raise InvalidResponseError(
             "Wrong functioncode: {} instead of {}. The response is: {!r}".format(
-                received_functioncode, functioncode, response
+                received_functioncode, functioncode, bytes(response)
             )
         )
 
@@ -1934,8 +4698,8 @@ def _extract_payload(
     else:
         last_databyte_number = len(response) - NUMBER_OF_CRC_BYTES
 
-    payload = response[first_databyte_number:last_databyte_number]
-    return payload
+    # The only copy of the response data
+    return bytes(memoryview(response)[first_databyte_number:last_databyte_number])
 
 
 # ###################################### #
@@ -2038,13 +4802,12 @@ def _calculate_minimum_silent_period(baudrate: Union[int, float]) -> float:
     # Avoid division by zero
     _check_numerical(baudrate, minvalue=1, description="baudrate")
 
-    BITTIMES_PER_CHARACTERTIME = 11
     MINIMUM_SILENT_CHARACTERTIMES = 3.5
     MINIMUM_SILENT_TIME_SECONDS = 0.00175  # See Modbus standard
 
     bittime = 1 / float(baudrate)
     return max(
-        bittime * BITTIMES_PER_CHARACTERTIME * MINIMUM_SILENT_CHARACTERTIMES,
+        bittime * _BITTIMES_PER_CHARACTERTIME * MINIMUM_SILENT_CHARACTERTIMES,
         MINIMUM_SILENT_TIME_SECONDS,
     )
 
@@ -2138,7 +4901,7 @@ def _num_to_two_bytes(
     else:
         formatcode += "H"  # Unsigned short (2 bytes)
 
-    outbytes = _pack_bytes(formatcode, integer)
+    outbytes = _pack_bytes_unchecked(formatcode, integer)
     assert len(outbytes) == 2
     return outbytes
 
@@ -2190,7 +4953,7 @@ def _two_bytes_to_num(
     else:
         formatcode += "H"  # Unsigned short (2 bytes)
 
-    fullregister: int = _unpack_bytes(formatcode, inputbytes)
+    fullregister: int = _unpack_bytes_unchecked(formatcode, inputbytes)
 
     if number_of_decimals == 0:
         return fullregister
@@ -2253,7 +5016,7 @@ def _long_to_bytes(
                 number_of_registers
             )
         )
-    outputbytes = _pack_bytes(formatcode, value)
+    outputbytes = _pack_bytes_unchecked(formatcode, value)
     if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
         outputbytes = _swap(outputbytes)
 
@@ -2322,7 +5085,7 @@ def _bytes_to_long(
     if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
         inputbytes = _swap(inputbytes)
 
-    return int(_unpack_bytes(formatcode, inputbytes))
+    return int(_unpack_bytes_unchecked(formatcode, inputbytes))
 
 
 def _float_to_bytes(
@@ -2381,7 +5144,7 @@ def _float_to_bytes(
             )
         )
 
-    outputbytes = _pack_bytes(formatcode, value)
+    outputbytes = _pack_bytes_unchecked(formatcode, value)
     if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
         outputbytes = _swap(outputbytes)
     assert len(outputbytes) == lengthtarget
@@ -2443,7 +5206,7 @@ def _bytes_to_float(
 
     if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
         inputbytes = _swap(inputbytes)
-    return float(_unpack_bytes(formatcode, inputbytes))
+    return float(_unpack_bytes_unchecked(formatcode, inputbytes))
 
 
 def _textstring_to_bytes(inputstring: str, number_of_registers: int = 16) -> bytes:
@@ -2567,14 +5330,19 @@ def _valuelist_to_bytes(valuelist: List[int], number_of_registers: int) -> bytes
     return outputbytes
 
 
-def _bytes_to_valuelist(inputbytes: bytes, number_of_registers: int) -> List[int]:
+def _bytes_to_valuelist(
+    inputbytes: bytes, number_of_registers: int, signed: bool = False
+) -> List[int]:
     """Convert bytes to a list of numerical values.
 
-    The bytes are interpreted as 'unsigned INT16'.
+    The bytes are interpreted as 'unsigned INT16', or 'signed INT16' if *signed*.
+    All values are unpacked in one call, with a cached :class:`struct.Struct`.
 
     Args:
         * inputbytes: The bytes from the slave. Length = 2 * *number_of_registers*
         * number_of_registers: The number of registers. For error checking.
+        * signed: Whether large positive values should be interpreted as
+          negative values (two's complement).
 
     Returns:
         A list of integers.
@@ -2588,13 +5356,136 @@ def _bytes_to_valuelist(inputbytes: bytes, number_of_registers: int) -> List[int
         inputbytes, "input bytes", minlength=number_of_bytes, maxlength=number_of_bytes
     )
 
-    values = []
-    for i in range(number_of_registers):
-        offset = _NUMBER_OF_BYTES_PER_REGISTER * i
-        sub_bytes = inputbytes[offset : (offset + _NUMBER_OF_BYTES_PER_REGISTER)]
-        values.append(int(_two_bytes_to_num(sub_bytes)))
+    formatstring = ">{}{}".format(number_of_registers, "h" if signed else "H")
+    return list(_get_struct(formatstring).unpack(inputbytes))
 
-    return values
+
+def _bytes_to_longs(
+    inputbytes: bytes,
+    number_of_values: int,
+    signed: bool = False,
+    number_of_registers: int = 2,
+    byteorder: int = BYTEORDER_BIG,
+) -> List[int]:
+    """Convert bytes to a list of long integers.
+
+    This is the multi-value variant of :func:`_bytes_to_long`: all values are
+    unpacked in one call, with a cached :class:`struct.Struct`.
+
+    Args:
+        * inputbytes: Length 2 * *number_of_registers* * *number_of_values*.
+        * number_of_values: The number of long integers.
+        * signed: Whether large positive values should be interpreted as
+          negative values.
+        * number_of_registers: Registers per value. Should be 2 or 4.
+        * byteorder: How multi-register data should be interpreted.
+
+    Returns:
+        A list of integers.
+
+    Raises:
+        TypeError, ValueError
+    """
+    _check_int(number_of_values, minvalue=1, description="number of values")
+    _check_bool(signed, description="signed parameter")
+    _check_int(
+        number_of_registers, minvalue=2, maxvalue=4, description="number of registers"
+    )
+    _check_int(
+        byteorder, minvalue=0, maxvalue=_MAX_BYTEORDER_VALUE, description="byteorder"
+    )
+    if number_of_registers not in [2, 4]:
+        raise ValueError(
+            "Wrong number of registers! Given value is {0!r}".format(
+                number_of_registers
+            )
+        )
+    number_of_bytes = (
+        _NUMBER_OF_BYTES_PER_REGISTER * number_of_registers * number_of_values
+    )
+    _check_bytes(
+        inputbytes, "input bytes", minlength=number_of_bytes, maxlength=number_of_bytes
+    )
+
+    if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
+        inputbytes = _swap(inputbytes)
+
+    formatstring = "{}{}{}".format(
+        ">" if byteorder in [BYTEORDER_BIG, BYTEORDER_BIG_SWAP] else "<",
+        number_of_values,
+        {(2, False): "L", (2, True): "l", (4, False): "Q", (4, True): "q"}[
+            (number_of_registers, signed)
+        ],
+    )
+    return list(_get_struct(formatstring).unpack(inputbytes))
+
+
+def _bytes_to_floats(
+    inputbytes: bytes,
+    number_of_values: int,
+    number_of_registers: int = 2,
+    byteorder: int = BYTEORDER_BIG,
+) -> List[float]:
+    """Convert bytes to a list of floats.
+
+    This is the multi-value variant of :func:`_bytes_to_float`: all values are
+    unpacked in one call, with a cached :class:`struct.Struct`.
+
+    Args:
+        * inputbytes: Length 2 * *number_of_registers* * *number_of_values*.
+        * number_of_values: The number of floats.
+        * number_of_registers: Registers per value. Can be 2 or 4.
+        * byteorder: How multi-register data should be interpreted.
+
+    Returns:
+        A list of floats.
+
+    Raises:
+        TypeError, ValueError
+    """
+    _check_int(number_of_values, minvalue=1, description="number of values")
+    _check_int(
+        number_of_registers, minvalue=2, maxvalue=4, description="number of registers"
+    )
+    _check_int(
+        byteorder, minvalue=0, maxvalue=_MAX_BYTEORDER_VALUE, description="byteorder"
+    )
+    if number_of_registers not in [2, 4]:
+        raise ValueError(
+            "Wrong number of registers! Given value is {0!r}".format(
+                number_of_registers
+            )
+        )
+    number_of_bytes = (
+        _NUMBER_OF_BYTES_PER_REGISTER * number_of_registers * number_of_values
+    )
+    _check_bytes(
+        inputbytes, "input bytes", minlength=number_of_bytes, maxlength=number_of_bytes
+    )
+
+    if byteorder in [BYTEORDER_BIG_SWAP, BYTEORDER_LITTLE_SWAP]:
+        inputbytes = _swap(inputbytes)
+
+    formatstring = "{}{}{}".format(
+        ">" if byteorder in [BYTEORDER_BIG, BYTEORDER_BIG_SWAP] else "<",
+        number_of_values,
+        "f" if number_of_registers == 2 else "d",
+    )
+    return list(_get_struct(formatstring).unpack(inputbytes))
+
+
+def _get_struct(formatstring: str) -> struct.Struct:
+    """Return a compiled :class:`struct.Struct`, cached by format string.
+
+    Args:
+        formatstring: String for the packing. See the :mod:`struct` module.
+
+    Error checking should have been done before calling this function.
+    """
+    compiled = _structs.get(formatstring)
+    if compiled is None:
+        compiled = _structs[formatstring] = struct.Struct(formatstring)
+    return compiled
 
 
 def _pack_bytes(formatstring: str, value: Any) -> bytes:
@@ -2615,8 +5506,17 @@ def _pack_bytes(formatstring: str, value: Any) -> bytes:
     """
     _check_string(formatstring, description="formatstring", minlength=1)
 
+    return _pack_bytes_unchecked(formatstring, value)
+
+
+def _pack_bytes_unchecked(formatstring: str, value: Any) -> bytes:
+    """Pack a value into bytes, with a format string built internally.
+
+    Same as :func:`_pack_bytes`, but without validating the format string.
+    The compiled format is cached, see :func:`_get_struct`.
+    """
     try:
-        result = struct.pack(formatstring, value)
+        result = _get_struct(formatstring).pack(value)
     except Exception as exc:
         errortext = "The value to send is probably out of range, as the num-to-bytes "
         errortext += "conversion failed. Value: {0!r} Struct format code is: {1}"
@@ -2644,8 +5544,17 @@ def _unpack_bytes(formatstring: str, packed_bytes: bytes) -> Any:
     _check_string(formatstring, description="formatstring", minlength=1)
     _check_bytes(packed_bytes, description="packed bytes", minlength=1)
 
+    return _unpack_bytes_unchecked(formatstring, packed_bytes)
+
+
+def _unpack_bytes_unchecked(formatstring: str, packed_bytes: bytes) -> Any:
+    """Unpack bytes into a value, with a format string built internally.
+
+    Same as :func:`_unpack_bytes`, but without validating the arguments. The
+    compiled format is cached, see :func:`_get_struct`.
+    """
     try:
-        value = struct.unpack(formatstring, packed_bytes)[0]
+        value = _get_struct(formatstring).unpack(packed_bytes)[0]
     except Exception:
         errortext = "The received bytes is probably wrong, as the bytes-to-num "
         errortext += "conversion failed. Bytes: {0!r} Struct format code is: {1}"
@@ -2696,6 +5605,8 @@ def _hexencode(inputbytes: bytes, insert_spaces: bool = False) -> bytes:
     Raises:
         TypeError, ValueError
     """
+    import binascii  # Only needed for Modbus ASCII and diagnostics
+
     _check_bytes(inputbytes, description="input bytes")
 
     if insert_spaces:
@@ -2726,6 +5637,8 @@ def _hexdecode(hexbytes: bytes) -> bytes:
     # Thus we need to live with this warning in Python3:
     # 'During handling of the above exception, another exception occurred'
 
+    import binascii  # Only needed for Modbus ASCII and diagnostics
+
     _check_bytes(hexbytes, description="hex bytes")
 
     if len(hexbytes) % 2 != 0:
@@ -2744,7 +5657,7 @@ def _hexdecode(hexbytes: bytes) -> bytes:
         raise TypeError(new_error_message)
 
 
-def _describe_bytes(inputbytes: bytes) -> str:
+def _describe_bytes(inputbytes: Union[bytes, bytearray, memoryview]) -> str:
     r"""Describe bytes in a human friendly way.
 
     Args:
@@ -3304,7 +6217,62 @@ def _is_serial_object(obj: Any) -> bool:
     return True
 
 
-def _calculate_crc(inputbytes: bytes) -> bytes:
+_CRC16TABLE_WIDE: Optional[array.array] = None
+"""CRC-16 lookup table with 65536 elements, built on first use.
+
+Indexed by the CRC register XOR the next two message bytes (little endian), it
+gives the register after those two bytes. This is slicing-by-2 with the two
+256-element tables merged into one lookup.
+"""
+
+_CRC_WIDE_TABLE_MIN_LENGTH = 16  # Shorter messages are faster byte by byte
+
+
+def _get_wide_crc_table() -> array.array:
+    """Return :data:`_CRC16TABLE_WIDE`, building it if necessary.
+
+    The table is built from :data:`_CRC16TABLE` in a few milliseconds, and uses
+    128 kB of memory.
+    """
+    global _CRC16TABLE_WIDE
+    if _CRC16TABLE_WIDE is None:
+        # Register after one zero byte, for each value of the low register byte
+        table_second_byte = [
+            (_CRC16TABLE[i] >> 8) ^ _CRC16TABLE[_CRC16TABLE[i] & 0xFF]
+            for i in range(256)
+        ]
+        _CRC16TABLE_WIDE = array.array(
+            "H", [high ^ low for high in _CRC16TABLE for low in table_second_byte]
+        )
+    return _CRC16TABLE_WIDE
+
+
+def _crc16(data: Union[bytes, bytearray, memoryview], register: int = 0xFFFF) -> int:
+    """Calculate the Modbus CRC-16 register value, without input validation.
+
+    Args:
+        * data: The message. A memoryview is processed without copying.
+        * register: Initial register value, for calculating in several steps.
+
+    Returns:
+        The CRC register as an integer. It is 0 for a message including a correct
+        CRC, see :func:`_check_crc_frame`.
+    """
+    length = len(data)
+    if length >= _CRC_WIDE_TABLE_MIN_LENGTH:
+        table = _CRC16TABLE_WIDE or _get_wide_crc_table()
+        for word in struct.unpack_from("<{}H".format(length >> 1), data):
+            register = table[register ^ word]
+        if not length & 1:
+            return register
+        data = data[-1:]
+
+    for current_byte in data:
+        register = (register >> 8) ^ _CRC16TABLE[(register ^ current_byte) & 0xFF]
+    return register
+
+
+def _calculate_crc(inputbytes: Union[bytes, bytearray, memoryview]) -> bytes:
     """Calculate CRC-16 for Modbus RTU.
 
     Args:
@@ -3313,15 +6281,27 @@ def _calculate_crc(inputbytes: bytes) -> bytes:
     Returns:
         A two-byte CRC, where the least significant byte is first.
     """
-    _check_bytes(inputbytes, description="CRC input bytes")
+    if not isinstance(inputbytes, (bytes, bytearray, memoryview)):
+        raise TypeError(
+            "The CRC input bytes should be bytes. Given: {!r}".format(inputbytes)
+        )
 
-    # Preload a 16-bit register with ones
-    register = 0xFFFF
+    return _crc16(inputbytes).to_bytes(2, "little")
 
-    for current_byte in inputbytes:
-        register = (register >> 8) ^ _CRC16TABLE[(register ^ current_byte) & 0xFF]
 
-    return _num_to_two_bytes(register, lsb_first=True)
+def _check_crc_frame(frame: Union[bytes, bytearray, memoryview]) -> bool:
+    """Check the CRC of a complete Modbus RTU frame.
+
+    The CRC-16 calculated over a message followed by its own (correct) CRC is
+    zero, so the frame is verified without slicing off the CRC bytes.
+
+    Args:
+        frame: Slave address + function code + data + CRC (two bytes).
+
+    Returns:
+        :const:`True` if the CRC is correct.
+    """
+    return len(frame) > 2 and _crc16(frame) == 0
 
 
 def _calculate_lrc(inputbytes: bytes) -> bytes:
@@ -3534,7 +6514,9 @@ def _check_response_payload(
             )
 
 
-def _check_response_slaveerrorcode(response: bytes) -> None:
+def _check_response_slaveerrorcode(
+    response: Union[bytes, bytearray, memoryview],
+) -> None:
     """Check if the slave indicates an error.
 
     Args:
@@ -4044,6 +7026,150 @@ def _get_diagnostic_string() -> str:
     return text
 
 
+def _benchmark_import_time(repetitions: int = 5) -> str:
+    """Measure the time to import this module in fresh Python interpreters.
+
+    Uses the ``-X importtime`` option, so the result includes the imported
+    dependencies (pySerial etc) but not the interpreter startup.
+
+    Args:
+        repetitions: The number of interpreters to start.
+
+    Returns:
+        A descriptive string with the best and the median import time.
+    """
+    import subprocess
+
+    _check_int(repetitions, minvalue=1, description="repetitions")
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(repetitions):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import " + __name__],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        for line in output.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == __name__:
+                results.append(int(fields[1]) / _SECONDS_TO_MILLISECONDS)
+    results.sort()
+    return "Import time for {}: best {:.1f} ms, median {:.1f} ms ({} runs)".format(
+        __name__, results[0], results[len(results) // 2], len(results)
+    )
+
+
+def _benchmark_crc(repetitions: int = 10000) -> str:
+    """Compare :func:`_crc16` with the byte-by-byte table algorithm.
+
+    Args:
+        repetitions: The number of calculations per message length.
+
+    Returns:
+        A descriptive string with the time per calculation, in microseconds.
+    """
+    import timeit
+
+    _check_int(repetitions, minvalue=1, description="repetitions")
+
+    def bytewise(inputbytes: bytes) -> int:
+        register = 0xFFFF
+        for current_byte in inputbytes:
+            register = (register >> 8) ^ _CRC16TABLE[(register ^ current_byte) & 0xFF]
+        return register
+
+    functions: List[Callable[[bytes], int]] = [bytewise, _crc16]
+    _get_wide_crc_table()  # Not part of the measurement
+    text = "CRC-16 time per message: byte by byte / _crc16 (us)\n"
+    for length in [8, 55, 255]:  # Request, 25 register response, maximum frame
+        message = bytes(range(length))
+        assert bytewise(message) == _crc16(message)
+        times = []
+        for function in functions:
+            seconds = min(
+                timeit.repeat(lambda: function(message), number=repetitions, repeat=3)
+            )
+            times.append(seconds / repetitions * 1e6)
+        text += "{:4} bytes: {:6.2f} / {:6.2f}\n".format(length, *times)
+    return text
+
+
+def _benchmark_codecs(repetitions: int = 20000) -> str:
+    """Measure the number conversion functions used for register data.
+
+    Args:
+        repetitions: The number of conversions per function.
+
+    Returns:
+        A descriptive string with the time per conversion, in microseconds.
+    """
+    import timeit
+
+    _check_int(repetitions, minvalue=1, description="repetitions")
+
+    registerdata = bytes(range(50))
+    cases = [
+        ("_num_to_two_bytes", lambda: _num_to_two_bytes(770)),
+        ("_two_bytes_to_num", lambda: _two_bytes_to_num(b"\x03\x02")),
+        ("_long_to_bytes", lambda: _long_to_bytes(1234567)),
+        ("_bytes_to_long", lambda: _bytes_to_long(b"\x01\x02\x03\x04")),
+        ("_float_to_bytes", lambda: _float_to_bytes(1.5)),
+        ("_bytes_to_float", lambda: _bytes_to_float(b"\x3f\x80\x00\x00")),
+        ("_bytes_to_valuelist (25)", lambda: _bytes_to_valuelist(registerdata, 25)),
+        ("_pack_bytes", lambda: _pack_bytes(">H", 770)),
+        ("_pack_bytes_unchecked", lambda: _pack_bytes_unchecked(">H", 770)),
+    ]
+    text = "Conversion time (us)\n"
+    for name, function in cases:
+        seconds = min(timeit.repeat(function, number=repetitions, repeat=3))
+        text += "{:>26}: {:6.2f}\n".format(name, seconds / repetitions * 1e6)
+    return text
+
+
+def _benchmark_read_registers(repetitions: int = 5000) -> str:
+    """Measure the protocol handling of :class:`Instrument` at CPU speed.
+
+    Uses a :class:`LoopbackPort` with a :class:`SimulatedSlave`, so the result is
+    the time spent in this module (and the simulated slave), without waiting for
+    any port.
+
+    Args:
+        repetitions: The number of calls per case.
+
+    Returns:
+        A descriptive string with the time per call, in microseconds.
+    """
+    import timeit
+
+    _check_int(repetitions, minvalue=1, description="repetitions")
+
+    slave = SimulatedSlave()
+    slave.set_registers(0, list(range(125)))
+    port = LoopbackPort({1: slave})
+    instrument = Instrument(port, 1)
+    prevalidated = Instrument(port, 1)
+    prevalidated.prevalidated = True
+    sweep = [(1, 3, address, 10) for address in range(0, 100, 10)]
+    cases = [
+        ("read_register", lambda: instrument.read_register(0)),
+        ("read_registers (25)", lambda: instrument.read_registers(0, 25)),
+        ("read_registers (125)", lambda: instrument.read_registers(0, 125)),
+        ("read_registers, prevalidated", lambda: prevalidated.read_registers(0, 25)),
+        ("read_long", lambda: instrument.read_long(0)),
+        ("read_float", lambda: instrument.read_float(0)),
+        ("write_register", lambda: instrument.write_register(200, 5)),
+        ("transact_many (10 x 10)", lambda: instrument.transact_many(sweep)),
+    ]
+    text = "Time per call with a loopback port (us)\n"
+    for name, function in cases:
+        seconds = min(timeit.repeat(function, number=repetitions, repeat=3))
+        text += "{:>30}: {:7.2f}\n".format(name, seconds / repetitions * 1e6)
+    return text
+
+
 # For backward compatibility
 _getDiagnosticString = _get_diagnostic_string
 
@@ -27,7 +27,18 @@ BUGS/Feature requests:
         For more info please check the  <a href="https://github.com/CreasolTech/domoticz-dts238">GitHub plugin page</a>
     </description>
     <params>
-        <param field="SerialPort" label="Modbus Port" width="200px" required="true" default="/dev/ttyUSB0" />
+        <param field="Mode5" label="Connection">
+            <options>
+                <option label="Serial port (RS485)" value="serial" default="true" />
+                <option label="Serial port (RS485), bus shared with other Modbus masters" value="shared" />
+                <option label="Ethernet gateway, Modbus RTU over TCP" value="rtu+tcp" />
+                <option label="Ethernet gateway, Modbus TCP" value="tcp" />
+                <option label="Serial port, passive (only listen to another Modbus master)" value="passive" />
+            </options>
+        </param>
+        <param field="SerialPort" label="Modbus Port" width="200px" required="false" default="/dev/ttyUSB0" />
+        <param field="Address" label="Gateway IP address (Ethernet only)" width="200px" required="false" default="192.168.1.10" />
+        <param field="Port" label="Gateway TCP port (Ethernet only)" width="60px" required="false" default="502" />
         <param field="Mode1" label="Baud rate" width="40px" required="true" default="9600"  />
         <param field="Mode3" label="Poll interval">
             <options>
@@ -41,6 +52,22 @@ BUGS/Feature requests:
             </options>
         </param>
         <param field="Mode2" label="Meter addresses" width="40px" required="true" default="2,3,4" />
+        <param field="Mode4" label="Log">
+            <options>
+                <option label="All values, every poll" value="0" />
+                <option label="Summary every minute" value="60" />
+                <option label="Summary every 5 minutes" value="300" default="true" />
+                <option label="Summary every 15 minutes" value="900" />
+                <option label="Summary every hour" value="3600" />
+                <option label="Errors only" value="-1" />
+            </options>
+        </param>
+        <param field="Mode6" label="Debug" width="75px">
+            <options>
+                <option label="True" value="Debug" />
+                <option label="False" value="Normal" default="true" />
+            </options>
+        </param>
     </params>
 </plugin>
 
@@ -48,6 +75,9 @@ BUGS/Feature requests:
 
 import minimalmodbus    #v2.1.1
 import random
+import struct
+import threading
+import time
 import Domoticz         #tested on Python 3.9.2 in Domoticz 2021.1 and 2023.1
 
 
@@ -91,31 +121,123 @@ DEVS={ #unit:     Type,Sub,swtype, Options, Image,  "en name", "it name"  ...oth
 }
 
 DEVSMAX=40; # max number of devices for each meter: Unit 1-40 for the first meter, 41-80 for the second meter, ....
+DEVPLANS={} # lang: list of (unit, name, type, subtype, switchtype, options, image, description) used by onStart() to create missing devices
+SNIFFMAXAGE=60  # passive mode: registers read by the other master are used if not older than this, in seconds
+
+class BusSniffer:
+    """Passive mode: listen to the Modbus RTU traffic between another master and the meters, never transmitting, and keep the registers read by the other master"""
+    def __init__(self, port, baudrate):
+        self.serial=minimalmodbus.serial.Serial(port, baudrate, timeout=0.1, exclusive=False)   # the port is never written
+        self.parser=minimalmodbus.RtuFrameParser(frame_timeout=max(3.5*11/baudrate, 0.02))   # USB adapters deliver bytes in chunks: longer silent interval
+        self.registers={}           # (slave, functioncode): {address: (value, time)}
+        self.lock=threading.Lock()  # guards registers, read by onHeartbeat
+        self.error=None             # last serial port or decoding error, logged by onHeartbeat (Domoticz API is not called by the sniffer thread)
+        self.running=True
+        self.thread=threading.Thread(target=self.run, name="DTS238 sniffer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running=False
+        self.thread.join()
+        self.serial.close()
+
+    def run(self):
+        while self.running:
+            try:
+                if not self.serial.is_open:
+                    self.serial.open()
+                data=self.serial.read(max(1, self.serial.in_waiting))
+                frames=self.parser.feed(data) if data else self.parser.flush()     # no data: silent interval after the last frame
+                for frame in frames:
+                    self.handleFrame(frame)
+            except OSError as e:    # serial port error (SerialException is an OSError): open the port again later
+                self.error=f"serial port error {e}"
+                self.serial.close()
+                time.sleep(1)
+            except Exception as e:  # unexpected frame content: skip it, and keep listening
+                self.error=f"error decoding the traffic: {type(e).__name__}: {e}"
+
+    def handleFrame(self, frame):
+        """Store the register values from the responses to read requests"""
+        request=frame.request
+        if frame.frametype!=minimalmodbus.FRAME_RESPONSE or request is None or frame.functioncode not in (3, 4):
+            return
+        address, count=struct.unpack(">HH", request.data)
+        values=struct.unpack(f">{count}H", frame.data[1:])
+        with self.lock:
+            registers=self.registers.setdefault((frame.slaveaddress, frame.functioncode), {})
+            for i in range(count):
+                registers[address+i]=(values[i], frame.timestamp)
+
+    def getResults(self, requests):
+        """Return the registers for each (slave, functioncode, address, count) request, like Instrument.transact_many(), or None if not read recently by the other master"""
+        results=[]
+        now=time.monotonic()
+        with self.lock:
+            for slave, functioncode, address, count in requests:
+                registers=self.registers.get((slave, functioncode), {})
+                values=[]
+                for a in range(address, address+count):
+                    item=registers.get(a)
+                    if item is None or now-item[1]>SNIFFMAXAGE:
+                        values=None
+                        break
+                    values.append(item[0])
+                results.append(values)
+        return results
 
 class BasePlugin:
     def __init__(self):
         self.rs485 = ""
+        self.passive = False       # passive mode: never transmit on the bus
+        self.sniffer = None        # BusSniffer, in passive mode
         self.slaves = [1]
+        self.debug = False
+        self.logInterval = 300     # seconds between summary lines; 0=log all values every poll, -1=errors only
+        self.summary = {}          # slave: [power, energyImp, energyExp, polls, errors] since the last summary
+        self.devHandles = []       # for each meter: list of Devices objects, indexed by DEVS key (None if missing)
+        self.devValues = []        # for each meter: list of the last sValue sent to each device
         return
 
+    def portName(self):
+        """Return the serial port, or the gateway URL for the Ethernet connections"""
+        if Parameters["Mode5"] in ("rtu+tcp", "tcp"):
+            return f"{Parameters['Mode5']}://{Parameters['Address']}:{Parameters['Port']}"
+        return Parameters["SerialPort"]
+
     def modbusInit(self, slave):
-        self.rs485 = minimalmodbus.Instrument(Parameters["SerialPort"], int(slave))
-        self.rs485.serial.baudrate = Parameters["Mode1"]
-        self.rs485.serial.bytesize = 8
-        self.rs485.serial.parity = minimalmodbus.serial.PARITY_NONE
-        self.rs485.serial.stopbits = 1
-        self.rs485.serial.timeout = 0.5
-        self.rs485.serial.exclusive = True
-        self.rs485.debug = True
+        if self.passive:
+            raise Exception("Passive mode: the plugin never transmits on the bus")
+        transport=Parameters["Mode5"] if Parameters["Mode5"] in ("rtu+tcp", "tcp") else "serial"
+        self.rs485 = minimalmodbus.Instrument(self.portName(), int(slave))
+        if transport=="serial":
+            settings=(("bytesize", 8), ("parity", minimalmodbus.serial.PARITY_NONE), ("stopbits", 1), ("exclusive", True), ("baudrate", int(Parameters["Mode1"])), ("timeout", 0.5))
+        else:
+            # RS485-to-Ethernet gateway: the TCP connection is kept open between polls
+            settings=(("baudrate", int(Parameters["Mode1"])), ("timeout", 0.5))
+        for name, value in settings:
+            if getattr(self.rs485.serial, name)!=value:     # pyserial reconfigures the open port at each assignment: only change what differs
+                setattr(self.rs485.serial, name, value)
+        self.rs485.debug = self.debug                 # Modbus frames are formatted only when debug is enabled
+        self.rs485.debug_handler = Domoticz.Debug
         self.rs485.mode = minimalmodbus.MODE_RTU
-        self.rs485.close_port_after_each_call = True
+        self.rs485.clear_buffers_only_if_needed = True    # flush the buffers only when noise has been received
+        if transport=="serial":
+            self.rs485.close_port_after_idle = 0.5    # keep the port open during the poll, then close it to let other plugins/programs use it
+            if Parameters["Mode5"]=="shared":
+                self.rs485.listen_before_talk = 0.05  # once per poll: wait until other Modbus masters are silent (longer than the meter response time)
 
     def onStart(self):
         Domoticz.Log("Starting DTS238 plugin")
+        self.debug=(Parameters["Mode6"]=="Debug")
+        if self.debug:
+            Domoticz.Debugging(1)
         self.pollTime=30 if Parameters['Mode3']=="" else int(Parameters['Mode3'])
         self.heartbeatNow=self.pollTime     # this is used to increase heartbeat in case of collisions
         Domoticz.Heartbeat(self.pollTime)
         self.runInterval = 1
+        self.logInterval=300 if Parameters['Mode4']=="" else int(Parameters['Mode4'])
+        self.summaryTime=time.monotonic()
         self._lang=Settings["Language"]
         # check if language set in domoticz exists
         if self._lang in LANGS:
@@ -130,60 +252,131 @@ class BasePlugin:
             if s>=2 and s<=247:
                 self.slaves.append(s)
 
+        self.passive=(Parameters["Mode5"]=="passive")
+        if self.passive:
+            self.snifferInit()
+
         # Check that device used to change default address exists
         if 240 not in Devices:
             Domoticz.Log("Create virtual device to change DTS238 address for meters with default address=1")
             Domoticz.Device(Name="Change address 1 -> 2-247", Description=f"DTS238 meter: change address from 1 to, ADDR=1", Unit=240, Type=243, Subtype=19, Used=1).Create()
         # Check that all devices exist, or create them
+        startTime=time.monotonic()
+        plan=self.devicePlan()
+        created=0
         s=0     # s used to compute unit for each energy meter: s=10, 20, 30, ... (base unit number for the current energy meter)
         for slave in self.slaves:
             if slave>1 and slave<=247:
-                for i in DEVS:
+                for (i, Name, Type, Subtype, Switchtype, Options, Image, Description) in plan:
                     unit=s+i
                     if unit<=250 and unit not in Devices:
-                        Options=DEVS[i][DEVOPTIONS] if DEVS[i][DEVOPTIONS] else {}
-                        Image=DEVS[i][DEVIMAGE] if DEVS[i][DEVIMAGE] else 0
-                        Description=""
-                        if i==1:
-                            Description=f"Meter Addr={slave}, Total power = imported + exported"
-                        elif i==7:
-                            Description=f"Meter Addr={slave}, Power Factor, ADDR={slave}"
-                        elif i==8:
-                            Description=f"Meter Addr={slave}, Net power = imported - exported"
-                        else:
-                            Description=f"Meter Addr={slave}"
-                        Domoticz.Log(f"Creating device Name={DEVS[i][self.lang]}, Description={Description}, Unit=unit, Type={DEVS[i][DEVTYPE]}, Subtype={DEVS[i][DEVSUBTYPE]}, Switchtype={DEVS[i][DEVSWITCHTYPE]} Options={Options}, Image={Image}")
-                        Domoticz.Device(Name=DEVS[i][self.lang], Description=Description, Unit=unit, Type=DEVS[i][DEVTYPE], Subtype=DEVS[i][DEVSUBTYPE], Switchtype=DEVS[i][DEVSWITCHTYPE], Image=Image, Used=1).Create()
+                        Description=Description.format(slave=slave)
+                        Domoticz.Log(f"Creating device Name={Name}, Description={Description}, Unit={unit}, Type={Type}, Subtype={Subtype}, Switchtype={Switchtype} Options={Options}, Image={Image}")
+                        Domoticz.Device(Name=Name, Description=Description, Unit=unit, Type=Type, Subtype=Subtype, Switchtype=Switchtype, Image=Image, Used=1).Create()
                         if Options!={}: # Init device and set options for kWh with EnergyMeterType=1
-                            if DEVS[i][DEVSUBTYPE]==29: # kWh
+                            if Subtype==29: # kWh
                                 Devices[unit].Update(0, "0;0")
                                 Devices[unit].Update(0, "0;0", Options=Options)
                             else:
-
                                 Devices[unit].Update(0, "0", Options=Options)
+                        created+=1
+                s+=DEVSMAX
+        if created>0:
+            Domoticz.Log(f"Created {created} devices in {(time.monotonic()-startTime)*1000:.0f}ms")
+        self.buildDeviceTable()
+
+    def devicePlan(self):
+        """Return the list of devices to be created for each meter, with names in the current language: computed once for each language"""
+        plan=DEVPLANS.get(self.lang)
+        if plan is None:
+            plan=[]
+            for i in DEVS:
+                if i==1:
+                    Description="Meter Addr={slave}, Total power = imported + exported"
+                elif i==7:
+                    Description="Meter Addr={slave}, Power Factor, ADDR={slave}"
+                elif i==8:
+                    Description="Meter Addr={slave}, Net power = imported - exported"
+                else:
+                    Description="Meter Addr={slave}"
+                plan.append((i, DEVS[i][self.lang], DEVS[i][DEVTYPE], DEVS[i][DEVSUBTYPE], DEVS[i][DEVSWITCHTYPE], DEVS[i][DEVOPTIONS] if DEVS[i][DEVOPTIONS] else {}, DEVS[i][DEVIMAGE] if DEVS[i][DEVIMAGE] else 0, Description))
+            DEVPLANS[self.lang]=plan
+        return plan
+
+    def buildDeviceTable(self):
+        """Build, for each meter, the list of device handles and last values, so onHeartbeat does not look up Devices"""
+        self.devHandles=[]
+        self.devValues=[]
+        s=0
+        for slave in self.slaves:
+            if slave>1 and slave<=247:
+                handles=[None]*(DEVSMAX+1)
+                values=[None]*(DEVSMAX+1)
+                for i in DEVS:
+                    if s+i in Devices:
+                        handles[i]=Devices[s+i]
+                        values[i]=handles[i].sValue
+                self.devHandles.append(handles)
+                self.devValues.append(values)
                 s+=DEVSMAX
 
 
+    def snifferInit(self):
+        """Passive mode: open the serial port and start listening, if not done yet. Return False in case of error (retried at next heartbeat)"""
+        if self.sniffer is None:
+            try:
+                self.sniffer=BusSniffer(Parameters["SerialPort"], int(Parameters["Mode1"]))
+            except Exception as e:
+                Domoticz.Error(f"Error opening serial port {Parameters['SerialPort']} in passive mode: {e}")
+                return False
+        return True
+
     def onStop(self):
         Domoticz.Log("Stopping DTS238 plugin")
+        if self.rs485:
+            self.rs485.close_port()    # close the port and stop the idle timer thread
+        if self.sniffer:
+            self.sniffer.stop()
 
     def onHeartbeat(self):
+        # read all meters in one sweep on the bus: for each meter, total energy (registers 0-1), registers 8 to 0x11 and registers 0x80 to 0x98, using function code 3
+        requests=[]
+        for slave in self.slaves:
+            if slave>1 and slave<=247:
+                requests+=[(slave, 3, 0, 2), (slave, 3, 8, 10), (slave, 3, 0x80, 0x19)]
+        if self.passive:
+            if not self.snifferInit():
+                results=[None]*len(requests)   # serial port error: all meters fail
+            else:
+                if self.sniffer.error:
+                    Domoticz.Error(f"Passive mode: {self.sniffer.error}")
+                    self.sniffer.error=None
+                results=self.sniffer.getResults(requests)     # registers read by the other master: no additional bus traffic
+        else:
+            try:
+                self.modbusInit(requests[0][0])
+                results=self.rs485.transact_many(requests)
+            except:
+                results=[None]*len(requests)   # serial port error: all meters fail
         s=0
+        r=0
         for slave in self.slaves:
-            # read all registers in one shot
             if slave>1 and slave<=247:
+                regs, register, register2 = results[r:r+3]
+                r+=3
                 try:
-                    self.modbusInit(slave)
-                    # Read data from energy meter
-                    registerEnergy=self.rs485.read_registers(0, 2, 3) # Read  registers from 0 to 8, using function code 3
-                    register= self.rs485.read_registers(8, 10, 3) # Read  registers from 8 to 0x11, using function code 3
-                    register2=self.rs485.read_registers(0x80, 0x19, 3)  # Read registers from 0x80 to 0x98
-                    self.rs485.serial.close()  #  Close that door !
+                    if not (isinstance(regs, list) and isinstance(register, list) and isinstance(register2, list)):
+                        raise Exception(f"Error reading meter {slave}")
+                    energy=((regs[0]<<16)+regs[1])*10     # Total energy (32 bit, registers 0-1), in Wh: read by the sweep above, so read_longs() (one more transaction) is not used
                 except:
                     Domoticz.Error(f"Error reading Modbus registers from device {slave}")
-                    self.heartbeatNow+=random.randint(1,5)    # manage collisions, increasing heartbeat once
-                    Domoticz.Heartbeat(self.heartbeatNow)
+                    self.summary.setdefault(slave, [0, 0, 0, 0, 0])[4]+=1
+                    if not self.passive:
+                        self.heartbeatNow+=random.randint(1,5)    # manage collisions, increasing heartbeat once
+                        Domoticz.Heartbeat(self.heartbeatNow)
                 else:
+                    handles=self.devHandles[s//DEVSMAX]
+                    values=self.devValues[s//DEVSMAX]
                     if self.heartbeatNow!=self.pollTime:
                         self.heartbeatNow=self.pollTime     # restore normal heartbeat time, as defined in the plugin configuration
                         Domoticz.Heartbeat(self.heartbeatNow)
@@ -229,7 +422,6 @@ class BasePlugin:
                     apower3=register2[0x14]                          # W signed
                     if apower2>=0x8000: apower3=0x10000-apower3
 
-                    energy=(registerEnergy[1] + (registerEnergy[0]<<16))*10 # Wh
                     energyImp=(register[3] + (register[2]<<16))*10     # Wh
                     energyExp=(register[1] + (register[0]<<16))*10     # Wh
                     energyNet=energyImp-energyExp
@@ -240,37 +432,57 @@ class BasePlugin:
                     pf2=register2[0x17]/10                               # %
                     pf3=register2[0x18]/10                               # %
 
-                    Domoticz.Status(f"Slave={slave}, P={power}W E={energy/1000}kWh Imp={energyImp/1000}kWh Exp={energyExp/1000}kWh f={frequency}Hz PF={pf}%")
-                    Domoticz.Status(f"Slave={slave}, L1: {power1}W {rpower1}VAR {apower1}VA {current1}A {voltage1}V PF={pf1}%")
-                    Domoticz.Status(f"Slave={slave}, L2: {power2}W {rpower2}VAR {apower2}VA {current2}A {voltage2}V PF={pf2}%")
-                    Domoticz.Status(f"Slave={slave}, L3: {power3}W {rpower3}VAR {apower3}VA {current3}A {voltage3}V PF={pf3}%")
-                    self.updateDevice(s+1, f"{power};{energy}")          # imported+exported energy
-                    self.updateDevice(s+2, f"{powerImp};{energyImp}")    # imported power/energy
-                    self.updateDevice(s+3, f"{powerExp};{energyExp}")    # exported power/energy
-                    self.updateDevice(s+4, f"{power};{energyNet}")       # Net energy = imported energy - exported energy.  power=signed energy (negative if exported)
-                    self.updateDevice2(s+5, power1)
-                    self.updateDevice2(s+6, power2)
-                    self.updateDevice2(s+7, power3)
-                    self.updateDevice2(s+8, rpower)
-                    self.updateDevice2(s+9, rpower1)
-                    self.updateDevice2(s+10, rpower2)
-                    self.updateDevice2(s+11, rpower3)
-                    self.updateDevice2(s+12, apower)
-                    self.updateDevice2(s+13, apower1)
-                    self.updateDevice2(s+14, apower2)
-                    self.updateDevice2(s+15, apower3)
-                    self.updateDevice(s+16, pf)
-                    self.updateDevice(s+17, pf1)
-                    self.updateDevice(s+18, pf2)
-                    self.updateDevice(s+19, pf3)
-                    self.updateDevice(s+20, voltage1)
-                    self.updateDevice(s+21, voltage2)
-                    self.updateDevice(s+22, voltage3)
-                    self.updateDevice(s+23, current1)
-                    self.updateDevice(s+24, current2)
-                    self.updateDevice(s+25, current3)
-                    self.updateDevice(s+26, frequency)
+                    if self.logInterval==0:    # verbose log: format status lines only in this case
+                        Domoticz.Status(f"Slave={slave}, P={power}W E={energy/1000}kWh Imp={energyImp/1000}kWh Exp={energyExp/1000}kWh f={frequency}Hz PF={pf}%")
+                        Domoticz.Status(f"Slave={slave}, L1: {power1}W {rpower1}VAR {apower1}VA {current1}A {voltage1}V PF={pf1}%")
+                        Domoticz.Status(f"Slave={slave}, L2: {power2}W {rpower2}VAR {apower2}VA {current2}A {voltage2}V PF={pf2}%")
+                        Domoticz.Status(f"Slave={slave}, L3: {power3}W {rpower3}VAR {apower3}VA {current3}A {voltage3}V PF={pf3}%")
+                    stat=self.summary.setdefault(slave, [0, 0, 0, 0, 0])
+                    stat[0]=power
+                    stat[1]=energyImp
+                    stat[2]=energyExp
+                    stat[3]+=1
+                    self.updateDevice(handles, values, 1, f"{power};{energy}")          # imported+exported energy
+                    self.updateDevice(handles, values, 2, f"{powerImp};{energyImp}")    # imported power/energy
+                    self.updateDevice(handles, values, 3, f"{powerExp};{energyExp}")    # exported power/energy
+                    self.updateDevice(handles, values, 4, f"{power};{energyNet}")       # Net energy = imported energy - exported energy.  power=signed energy (negative if exported)
+                    self.updateDevice2(handles, values, 5, power1)
+                    self.updateDevice2(handles, values, 6, power2)
+                    self.updateDevice2(handles, values, 7, power3)
+                    self.updateDevice2(handles, values, 8, rpower)
+                    self.updateDevice2(handles, values, 9, rpower1)
+                    self.updateDevice2(handles, values, 10, rpower2)
+                    self.updateDevice2(handles, values, 11, rpower3)
+                    self.updateDevice2(handles, values, 12, apower)
+                    self.updateDevice2(handles, values, 13, apower1)
+                    self.updateDevice2(handles, values, 14, apower2)
+                    self.updateDevice2(handles, values, 15, apower3)
+                    self.updateDevice(handles, values, 16, pf)
+                    self.updateDevice(handles, values, 17, pf1)
+                    self.updateDevice(handles, values, 18, pf2)
+                    self.updateDevice(handles, values, 19, pf3)
+                    self.updateDevice(handles, values, 20, voltage1)
+                    self.updateDevice(handles, values, 21, voltage2)
+                    self.updateDevice(handles, values, 22, voltage3)
+                    self.updateDevice(handles, values, 23, current1)
+                    self.updateDevice(handles, values, 24, current2)
+                    self.updateDevice(handles, values, 25, current3)
+                    self.updateDevice(handles, values, 26, frequency)
                 s+=DEVSMAX    # Increment the base for each device unit
+        if self.logInterval>0:
+            now=time.monotonic()
+            if now-self.summaryTime>=self.logInterval:
+                self.summaryTime=now
+                self.logSummary()
+
+    def logSummary(self):
+        """Write one status line with the last values and the poll/error counters of all meters on the bus"""
+        items=[]
+        for slave, stat in self.summary.items():
+            items.append(f"Slave={slave} P={stat[0]}W Imp={stat[1]/1000}kWh Exp={stat[2]/1000}kWh polls={stat[3]} errors={stat[4]}")
+        if items:
+            Domoticz.Status(f"{self.portName()}: "+", ".join(items))
+        self.summary={}
 
     def onCommand(self, Unit, Command, Level, Hue):
         Domoticz.Status(f"Command for {Devices[Unit].Name}: Unit={Unit}, Command={Command}, Level={Level}")
@@ -284,7 +496,9 @@ class BasePlugin:
                 if (opt[:5]=="ADDR="):
                     par=int(float(opt[5:]))
                     slave=self.slaves[int(Unit/DEVSMAX)]
-                    if par>=1 and par<=247 and par!=slave:
+                    if self.passive:
+                        Domoticz.Error("Passive mode: the plugin never transmits, so the meter address can't be changed")
+                    elif par>=1 and par<=247 and par!=slave:
                         # Change Modbus slave address to this device
                         baudValue=1
                         if Parameters["Mode1"]==4800:
@@ -297,26 +511,40 @@ class BasePlugin:
                         try: 
                             self.modbusInit(slave)
                             self.rs485.write_registers(0x15, [ par*256+baudValue ])   # Write register 0x15 with (par<<8 | 1) where par=slave address, 1=9600bps
-                            self.rs485.serial.close()  #  Close that door !
                         except:
                             Domoticz.Error(f"Error writing Modbus register 0x15 (to change slave address) to device {slave}")
                         else:
                             Domoticz.Log(f"Device with slave address {slave} successfully reprogrammed with new slave address {par}")
                             Devices[Unit].Update(nValue=Devices[Unit].nValue, sValue=Devices[Unit].sValue, Description=f"Power Factor,ADDR={slave}")
 
-    def updateDevice(self, index, value):
-        """Check if device value is different from "value" and update it in case"""
-        svalue=str(value)
-        if Devices[index].sValue != svalue:
-            Domoticz.Status(f"Update Devices[{index}] {Devices[index].Name}")
-            Devices[index].Update(0, svalue)
+    def onDeviceAdded(self, Unit):
+        self.buildDeviceTable()
 
-    def updateDevice2(self, index, firstvalue):
-        """Check if device firstvalue is different from first value in the device,  and update it in case it's different"""
-        svalue=f"{firstvalue};"
-        if Devices[index].sValue.find(svalue)!=0:
-            Domoticz.Status(f"Update Devices[{index}] {Devices[index].Name}")
-            Devices[index].Update(0, f"{firstvalue};0")
+    def onDeviceRemoved(self, Unit):
+        self.buildDeviceTable()
+
+    def updateDevice(self, handles, values, i, value):
+        """Check if device value is different from the last value sent, and update it in case"""
+        svalue=str(value)
+        if values[i] != svalue:
+            dev=handles[i]
+            if dev is not None:
+                if self.logInterval==0:
+                    Domoticz.Status(f"Update Devices[{dev.Unit}] {dev.Name}")
+                dev.Update(0, svalue)
+                values[i]=svalue
+
+    def updateDevice2(self, handles, values, i, firstvalue):
+        """Check if device firstvalue is different from first value last sent to the device,  and update it in case it's different"""
+        last=values[i]
+        if last is None or last.find(f"{firstvalue};")!=0:
+            dev=handles[i]
+            if dev is not None:
+                if self.logInterval==0:
+                    Domoticz.Status(f"Update Devices[{dev.Unit}] {dev.Name}")
+                svalue=f"{firstvalue};0"
+                dev.Update(0, svalue)
+                values[i]=svalue
 
 
 global _plugin
@@ -342,3 +570,11 @@ def onDeviceModified(Unit):
     global _plugin
     _plugin.onDeviceModified(Unit)
 
+def onDeviceAdded(Unit):
+    global _plugin
+    _plugin.onDeviceAdded(Unit)
+
+def onDeviceRemoved(Unit):
+    global _plugin
+    _plugin.onDeviceRemoved(Unit)
+
@@ -0,0 +1,723 @@
+"""Tests for minimalmodbus, using the in-memory LoopbackPort and SimulatedSlave."""
+
+import collections
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import minimalmodbus
+
+SLAVEADDRESS = 1
+
+
+@pytest.fixture
+def slave():
+    return minimalmodbus.SimulatedSlave(number_of_registers=256)
+
+
+@pytest.fixture
+def port(request, slave):
+    # The default name is made from id(), which can be reused by a later test,
+    # together with the per-port state and statistics
+    port = minimalmodbus.LoopbackPort(
+        {SLAVEADDRESS: slave}, port="loopback://" + request.node.name
+    )
+    port.open()
+    yield port
+    port.close()
+
+
+@pytest.fixture
+def instrument(port):
+    return minimalmodbus.Instrument(port, SLAVEADDRESS)
+
+
+# ###################### #
+# Reading several values #
+# ###################### #
+
+
+def test_read_longs(instrument, slave):
+    slave.set_registers(10, [0x0001, 0x0002, 0xFFFF, 0xFFFE])
+    assert instrument.read_longs(10, 2) == [0x00010002, 0xFFFFFFFE]
+    assert instrument.read_longs(10, 2, signed=True) == [0x00010002, -2]
+
+
+@pytest.mark.parametrize("number_of_registers", [1, 3, 5])
+def test_read_longs_wrong_number_of_registers(instrument, slave, number_of_registers):
+    with pytest.raises(ValueError):
+        instrument.read_longs(0, 1, number_of_registers=number_of_registers)
+    assert slave.number_of_requests == 0
+
+
+@pytest.mark.parametrize("number_of_registers", [1, 3, 5])
+def test_read_floats_wrong_number_of_registers(instrument, slave, number_of_registers):
+    with pytest.raises(ValueError):
+        instrument.read_floats(0, 1, number_of_registers=number_of_registers)
+    assert slave.number_of_requests == 0
+
+
+def test_read_with_broadcast_is_rejected(port, slave):
+    instrument = minimalmodbus.Instrument(port, 0)
+    with pytest.raises(ValueError, match="broadcast"):
+        instrument.read_longs(0, 1)
+    with pytest.raises(ValueError, match="broadcast"):
+        instrument.read_registers(0, 1)
+    result = instrument.transact_many([(0, 3, 0, 1)])
+    assert isinstance(result[0], ValueError)
+    assert "Reading is not possible with broadcast" in str(result[0])
+    assert slave.number_of_requests == 0
+
+
+# ######################### #
+# Modbus TCP (MBAP) framing #
+# ######################### #
+
+
+@pytest.fixture
+def tcp_server(slave):
+    """Modbus TCP server for the slave. Yields the port name and the requests."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    requests = []
+
+    def serve():
+        connection, _ = server.accept()
+        with connection, connection.makefile("rb") as stream:
+            while True:
+                header = stream.read(7)
+                if len(header) < 7:
+                    return
+                transaction_id, protocol_id, length, unit_id = struct.unpack(
+                    ">HHHB", header
+                )
+                pdu = stream.read(length - 1)
+                requests.append((transaction_id, protocol_id, length, unit_id, pdu))
+                response = slave.handle_request(pdu)
+                # A response to a transaction that is not outstanding, to discard
+                connection.sendall(
+                    struct.pack(">HHHB", transaction_id + 0x8000, 0, 3, unit_id)
+                    + b"\x83\x02"
+                )
+                connection.sendall(
+                    struct.pack(">HHHB", transaction_id, 0, len(response) + 1, unit_id)
+                    + response
+                )
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield "tcp://127.0.0.1:{}".format(server.getsockname()[1]), requests
+    server.close()
+
+
+def test_modbus_tcp_framing(tcp_server, slave):
+    portname, requests = tcp_server
+    port = minimalmodbus.ModbusTcpPort(portname)
+    try:
+        instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+        instrument.write_register(3, 77, functioncode=6)
+        assert instrument.read_register(3) == 77
+    finally:
+        port.close()
+    assert requests == [
+        (1, 0, 6, SLAVEADDRESS, b"\x06\x00\x03\x00\x4d"),
+        (2, 0, 6, SLAVEADDRESS, b"\x03\x00\x03\x00\x01"),
+    ]
+
+
+def test_modbus_tcp_pipelined_sweep(tcp_server, slave):
+    portname, requests = tcp_server
+    slave.set_registers(0, list(range(1000, 1020)))
+    port = minimalmodbus.ModbusTcpPort(portname, pipeline_depth=4)
+    try:
+        instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+        results = instrument.transact_many(
+            [(SLAVEADDRESS, 3, address, 2) for address in range(0, 20, 2)]
+        )
+    finally:
+        port.close()
+    assert results == [[1000 + address, 1001 + address] for address in range(0, 20, 2)]
+    assert [request[0] for request in requests] == list(range(1, 11))
+
+
+def test_socket_port_is_shared_by_name(tcp_server):
+    portname, _ = tcp_server
+    first = minimalmodbus.Instrument(portname, SLAVEADDRESS)
+    try:
+        second = minimalmodbus.Instrument(portname, 2)
+        assert second.serial is first.serial
+    finally:
+        first.serial.close()
+        del minimalmodbus._serialports[portname]
+
+
+def test_socket_port_connects_without_the_registry_lock(monkeypatch, slave):
+    connecting = threading.Event()
+
+    def slow_connect(portname):
+        connecting.set()
+        time.sleep(0.2)  # Like a gateway that does not answer
+        return minimalmodbus.LoopbackPort({SLAVEADDRESS: slave}, port=portname)
+
+    monkeypatch.setattr(minimalmodbus, "_create_socket_port", slow_connect)
+    portname = "rtu+tcp://192.0.2.1:502"
+    thread = threading.Thread(
+        target=minimalmodbus.Instrument, args=(portname, SLAVEADDRESS)
+    )
+    thread.start()
+    try:
+        assert connecting.wait(1)
+        assert minimalmodbus._registry_lock.acquire(timeout=0.1)
+        minimalmodbus._registry_lock.release()
+    finally:
+        thread.join()
+        del minimalmodbus._serialports[portname]
+
+
+# ### #
+# CRC #
+# ### #
+
+
+def _bitwise_crc(data):
+    register = 0xFFFF
+    for byte in data:
+        register ^= byte
+        for _ in range(8):
+            if register & 1:
+                register = (register >> 1) ^ 0xA001
+            else:
+                register >>= 1
+    return register
+
+
+def test_calculate_crc_known_value():
+    assert minimalmodbus._calculate_crc(b"\x01\x03\x00\x00\x00\x01") == b"\x84\x0a"
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 15, 16, 17, 255, 256])
+def test_crc_tables_match_bitwise_calculation(length):
+    data = bytes((7 * i + 3) & 0xFF for i in range(length))
+    assert minimalmodbus._crc16(data) == _bitwise_crc(data)
+    assert minimalmodbus._crc16(memoryview(data)) == _bitwise_crc(data)
+
+
+def test_check_crc_frame():
+    message = bytes(range(20))
+    frame = message + minimalmodbus._calculate_crc(message)
+    assert minimalmodbus._check_crc_frame(frame)
+    assert not minimalmodbus._check_crc_frame(frame[:-1] + b"\x00")
+    assert not minimalmodbus._check_crc_frame(b"\xff\xff")
+
+
+# ################### #
+# Request frame cache #
+# ################### #
+
+
+@pytest.fixture
+def frame_cache(monkeypatch):
+    cache = collections.OrderedDict()
+    monkeypatch.setattr(minimalmodbus, "_request_frame_cache", cache)
+    return cache
+
+
+def test_request_frame_cache_reuses_frames(instrument, slave, frame_cache):
+    slave.set_registers(0, [1, 2, 3])
+    assert instrument.read_registers(0, 3) == [1, 2, 3]
+    key = (SLAVEADDRESS, minimalmodbus.MODE_RTU, 3, 0, 3)
+    frame = frame_cache[key]
+    assert frame == (b"\x01\x03\x00\x00\x00\x03\x05\xcb", 11)
+    assert instrument.read_registers(0, 3) == [1, 2, 3]
+    assert frame_cache[key] is frame
+
+
+def test_request_frame_cache_evicts_least_recently_used(frame_cache):
+    size = minimalmodbus._REQUEST_FRAME_CACHE_SIZE
+    for address in range(size):
+        minimalmodbus._store_request_frame((1, "rtu", 3, address, 1), (b"", 7))
+    assert minimalmodbus._get_request_frame((1, "rtu", 3, 0, 1)) == (b"", 7)
+    minimalmodbus._store_request_frame((1, "rtu", 3, size, 1), (b"", 7))
+    assert len(frame_cache) == size
+    assert (1, "rtu", 3, 0, 1) in frame_cache
+    assert minimalmodbus._get_request_frame((1, "rtu", 3, 1, 1)) is None
+
+
+# ################## #
+# Prevalidated reads #
+# ################## #
+
+
+def test_prevalidated_read_registers(instrument, slave):
+    instrument.prevalidated = True
+    slave.set_registers(0, [5, 6])
+    assert instrument.read_registers(0, 2) == [5, 6]
+    assert instrument._prevalidated_reads == {(SLAVEADDRESS, "rtu", 3, 0, 2)}
+    slave.set_registers(0, [7, 8])
+    assert instrument.read_registers(0, 2) == [7, 8]
+    slave.exception_code = 2
+    with pytest.raises(minimalmodbus.IllegalRequestError):
+        instrument.read_registers(0, 2)
+
+
+def test_prevalidated_does_not_skip_other_checks(instrument):
+    instrument.prevalidated = True
+    with pytest.raises(ValueError):
+        instrument._communicate(b"", 5)
+
+
+# ################ #
+# Response parsing #
+# ################ #
+
+
+@pytest.mark.parametrize("mode", [minimalmodbus.MODE_RTU, minimalmodbus.MODE_ASCII])
+def test_read_registers_in_both_modes(instrument, slave, mode):
+    instrument.mode = mode
+    slave.set_registers(3, [0x1234, 0xABCD])
+    assert instrument.read_registers(3, 2) == [0x1234, 0xABCD]
+    slave.exception_code = 2
+    with pytest.raises(minimalmodbus.IllegalRequestError):
+        instrument.read_registers(3, 2)
+
+
+# ############### #
+# Receive buffers #
+# ############### #
+
+
+def test_receive_buffer(instrument, slave):
+    instrument.use_receive_buffer = True
+    slave.set_registers(0, [1, 2, 3])
+    assert instrument.read_registers(0, 3) == [1, 2, 3]
+    assert instrument.read_registers(1, 1) == [2]
+    request, number_of_bytes = minimalmodbus._get_request_frame(
+        (SLAVEADDRESS, "rtu", 3, 0, 3)
+    )
+    response = instrument._communicate(request, number_of_bytes)
+    assert isinstance(response, memoryview)
+    assert bytes(response[3:9]) == b"\x00\x01\x00\x02\x00\x03"
+
+
+def test_receive_buffer_is_per_thread(instrument, slave):
+    instrument.use_receive_buffer = True
+    slave.set_registers(0, [1, 2])
+    request = minimalmodbus._embed_payload(SLAVEADDRESS, "rtu", 3, b"\x00\x00\x00\x02")
+    response = instrument._communicate(request, 9)
+    expected = bytes(response)
+
+    def other_thread():
+        slave.set_registers(0, [3, 4])
+        instrument._communicate(request, 9)
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+    assert bytes(response) == expected
+
+
+# ######################## #
+# Several reads in a sweep #
+# ######################## #
+
+
+def test_transact_many(instrument, slave):
+    slave.set_registers(0, [11, 12])
+    slave.set_registers(5, [0x1234], functioncode=4)
+    slave.coils[3] = 1
+    results = instrument.transact_many(
+        [
+            (SLAVEADDRESS, 3, 0, 2),
+            (SLAVEADDRESS, 4, 5, 1),
+            (SLAVEADDRESS, 1, 2, 3),
+        ]
+    )
+    assert results == [[11, 12], [0x1234], [0, 1, 0]]
+    assert slave.number_of_requests == 3
+
+
+def test_transact_many_reports_errors_per_request(instrument, slave):
+    slave.set_registers(0, [11])
+    results = instrument.transact_many(
+        [
+            (SLAVEADDRESS, 3, 0, 200),  # Too many registers
+            (2, 3, 0, 1),  # Missing slave
+            (SLAVEADDRESS, 3, 1000, 1),  # Outside the table
+            (SLAVEADDRESS, 3, 0, 1),
+        ]
+    )
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], minimalmodbus.NoResponseError)
+    assert isinstance(results[2], minimalmodbus.IllegalRequestError)
+    assert results[3] == [11]
+    assert slave.number_of_requests == 2
+
+
+def test_transact_many_validates_before_the_frame_cache(instrument, frame_cache):
+    frame_cache[(SLAVEADDRESS, "rtu", 5, 0, 1)] = (b"\x01\x05\x00\x00\x00\x01", 8)
+    results = instrument.transact_many([(SLAVEADDRESS, 5, 0, 1)])
+    assert isinstance(results[0], ValueError)
+
+
+# ########## #
+# Port locks #
+# ########## #
+
+
+def test_port_lock_serializes_transactions(port, instrument, slave):
+    slave.set_registers(0, [42])
+    portstate = minimalmodbus._get_port_state(port.port)
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(instrument.read_register(0))
+    )
+    with portstate.lock:
+        thread.start()
+        thread.join(0.05)
+        assert thread.is_alive()  # Waiting for the lock
+        assert slave.number_of_requests == 0
+    thread.join()
+    assert results == [42]
+    statistics = instrument.port_statistics
+    assert statistics["contentions"] == 1
+    assert statistics["wait_time"] >= 0.05
+
+
+def test_port_lock_with_several_threads(port, slave):
+    slave.set_registers(0, list(range(10)))
+    errors = []
+
+    def poll():
+        instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+        try:
+            for _ in range(50):
+                assert instrument.read_registers(0, 10) == list(range(10))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=poll) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert slave.number_of_requests == 200
+
+
+# ############### #
+# Simulated slave #
+# ############### #
+
+
+def test_set_registers_outside_the_table(slave):
+    slave.set_registers(254, [1, 2])
+    assert len(slave.holding_registers) == 512
+    with pytest.raises(ValueError):
+        slave.set_registers(255, [1, 2])
+    with pytest.raises(ValueError):
+        slave.set_registers(-1, [1], functioncode=4)
+    assert len(slave.holding_registers) == 512
+    assert len(slave.input_registers) == 512
+
+
+def test_broadcast_reaches_all_slaves(slave):
+    other = minimalmodbus.SimulatedSlave(number_of_registers=16)
+    port = minimalmodbus.LoopbackPort({SLAVEADDRESS: slave, 2: other})
+    minimalmodbus.Instrument(port, 0).write_register(1, 99, functioncode=6)
+    assert slave.holding_registers[2:4] == other.holding_registers[2:4] == b"\x00c"
+
+
+# ############# #
+# Read planning #
+# ############# #
+
+
+def test_plan_register_reads_merges_small_gaps():
+    plan = minimalmodbus.plan_register_reads({1: [0, 2, 3]})
+    assert plan == [(1, 3, 0, 4)]
+
+
+def test_plan_register_reads_splits_large_gaps():
+    plan = minimalmodbus.plan_register_reads({1: [0, 1, 100], 2: [5]})
+    assert plan == [(1, 3, 0, 2), (1, 3, 100, 1), (2, 3, 5, 1)]
+
+
+def test_plan_register_reads_avoids_unreadable_registers():
+    plan = minimalmodbus.plan_register_reads({1: [0, 2]}, unreadable={1: [1]})
+    assert plan == [(1, 3, 0, 1), (1, 3, 2, 1)]
+
+
+def test_plan_register_reads_limits_block_size():
+    plan = minimalmodbus.plan_register_reads({1: range(5)}, max_block_size=2)
+    assert plan == [(1, 3, 0, 2), (1, 3, 2, 2), (1, 3, 4, 1)]
+
+
+def test_execute_read_plan(instrument, slave):
+    slave.set_registers(0, list(range(100, 110)))
+    plan = minimalmodbus.plan_register_reads({SLAVEADDRESS: [1, 3, 8]})
+    values = minimalmodbus.execute_read_plan(instrument, plan)
+    for address in [1, 3, 8]:
+        assert values[SLAVEADDRESS][address] == 100 + address
+
+
+# ########## #
+# Idle close #
+# ########## #
+
+
+def _wait_until_closed(port, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while port.is_open and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return not port.is_open
+
+
+def test_close_port_after_idle(port, instrument):
+    instrument.close_port_after_idle = 0.05
+    instrument.read_register(0)
+    assert port.is_open
+    assert _wait_until_closed(port)
+    instrument.read_register(0)  # Opened again
+    assert port.is_open
+    instrument.close_port()
+    assert not port.is_open
+
+
+def test_close_port_after_idle_also_after_errors(port, instrument):
+    instrument.close_port_after_idle = 0.05
+    instrument.handle_local_echo = True  # The loopback port has no local echo
+    with pytest.raises(minimalmodbus.LocalEchoError):
+        instrument.read_register(0)
+    assert _wait_until_closed(port)
+
+
+# ############################ #
+# Port timing and measurements #
+# ############################ #
+
+
+def test_port_timing_follows_the_baudrate(port, instrument):
+    portstate = minimalmodbus._get_port_state(port.port)
+    timing = portstate.get_timing(port)
+    assert portstate.get_timing(port) is timing
+    assert timing.frame_time(8) == pytest.approx(8 * 11 / 19200)
+    port.baudrate = 9600
+    instrument.read_register(0)
+    assert portstate.get_timing(port).frame_time(8) == pytest.approx(8 * 11 / 9600)
+
+
+def test_adaptive_timeout(port, instrument):
+    port.timeout = 1.0
+    instrument.adaptive_timeout = True
+    for _ in range(minimalmodbus._ADAPTIVE_TIMEOUT_MIN_SAMPLES + 1):
+        instrument.read_registers(0, 10)
+    assert port.timeout < 0.1
+    port.timeout = 0.5  # Set by the user
+    instrument.read_registers(0, 10)
+    portstate = minimalmodbus._get_port_state(port.port)
+    assert portstate.response_times.configured_timeout == 0.5
+    assert port.timeout < 0.1
+
+
+def test_bus_utilization_is_a_fraction(instrument):
+    for _ in range(50):
+        instrument.transact_many(
+            [(SLAVEADDRESS, 3, 0, 100), (SLAVEADDRESS, 3, 100, 100)]
+        )
+    statistics = instrument.port_statistics
+    assert statistics["bus_time"] > 0
+    assert 0 < statistics["bus_utilization"] <= 1
+
+
+# ############## #
+# Silent periods #
+# ############## #
+
+
+def test_wait_until_never_returns_early():
+    waiter = minimalmodbus._SilentPeriodWaiter()
+    for delay in [0.0, 0.001, 0.003, 0.01]:
+        deadline = time.monotonic() + delay
+        waiter.wait_until(deadline)
+        assert time.monotonic() >= deadline
+    assert waiter.sleeps >= 1
+    assert 0 <= waiter.spin_time <= waiter.max_spin_time
+    assert waiter.get_statistics()["sleeps"] == waiter.sleeps
+
+
+class _SlowBusPort(minimalmodbus.LoopbackPort):
+    minimum_silent_period = 0.01
+
+    def write(self, data):
+        self.write_times.append(time.monotonic())
+        return super().write(data)
+
+
+def test_silent_period_between_transactions(slave):
+    port = _SlowBusPort({SLAVEADDRESS: slave}, port="loopback://slow")
+    port.write_times = []
+    instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+    for _ in range(5):
+        instrument.read_register(0)
+    gaps = [b - a for a, b in zip(port.write_times, port.write_times[1:])]
+    assert min(gaps) >= 0.01
+    assert instrument.port_statistics["sleeps"] == 4
+
+
+# ############### #
+# Buffer clearing #
+# ############### #
+
+
+class _CountingPort(minimalmodbus.LoopbackPort):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resets = 0
+
+    def reset_input_buffer(self):
+        self.resets += 1
+        super().reset_input_buffer()
+
+
+def test_clear_buffers_only_if_needed(slave):
+    port = _CountingPort({SLAVEADDRESS: slave}, port="loopback://counting")
+    instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+    instrument.clear_buffers_only_if_needed = True
+    instrument.read_register(0)
+    assert port.resets == 0
+    port._received += b"\x00\xff\x13"  # Noise
+    slave.set_registers(0, [7])
+    assert instrument.read_register(0) == 7
+    assert port.resets == 1
+    statistics = instrument.port_statistics
+    assert statistics["noise_events"] == 1
+    assert statistics["noise_bytes"] == 3
+    instrument.clear_buffers_only_if_needed = False
+    instrument.read_register(0)
+    assert port.resets == 2
+
+
+def test_socket_port_counts_waiting_bytes():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = minimalmodbus.RtuOverTcpPort(
+        "rtu+tcp://127.0.0.1:{}".format(server.getsockname()[1])
+    )
+    connection, _ = server.accept()
+    try:
+        connection.sendall(b"\x01" * 300)
+        deadline = time.monotonic() + 1
+        while port.in_waiting < 300 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert port.in_waiting == 300
+        assert port.read(10) == b"\x01" * 10
+        assert port.in_waiting == 290
+        port.reset_input_buffer()
+        assert port.in_waiting == 0
+    finally:
+        port.close()
+        connection.close()
+        server.close()
+
+
+# ################## #
+# Listen before talk #
+# ################## #
+
+
+class _SharedBusPort(minimalmodbus.LoopbackPort):
+    """Loopback port with traffic from another master for the first polls."""
+
+    def __init__(self, *args, busy_polls=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.busy_polls = busy_polls
+
+    @property
+    def in_waiting(self):
+        if self.busy_polls:
+            self.busy_polls -= 1
+            return 1
+        return super().in_waiting
+
+
+def test_listen_before_talk_defers_requests(slave):
+    port = _SharedBusPort({SLAVEADDRESS: slave}, port="loopback://shared", busy_polls=2)
+    instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+    instrument.listen_before_talk = 0.005
+    slave.set_registers(0, [3])
+    assert instrument.read_register(0) == 3
+    statistics = instrument.port_statistics
+    assert statistics["bus_busy_events"] == 2
+    assert statistics["bus_busy_errors"] == 0
+
+
+def test_listen_before_talk_gives_up_on_a_busy_bus(slave):
+    port = _SharedBusPort(
+        {SLAVEADDRESS: slave}, port="loopback://busy", busy_polls=10**6
+    )
+    instrument = minimalmodbus.Instrument(port, SLAVEADDRESS)
+    instrument.listen_before_talk = 0.001
+    with pytest.raises(minimalmodbus.BusBusyError):
+        instrument.read_register(0)
+    results = instrument.transact_many([(SLAVEADDRESS, 3, 0, 1), (2, 3, 0, 200)])
+    assert isinstance(results[0], minimalmodbus.BusBusyError)
+    assert isinstance(results[1], ValueError)
+    assert slave.number_of_requests == 0
+    assert instrument.port_statistics["bus_busy_errors"] == 2
+
+
+# ################ #
+# RTU frame parser #
+# ################ #
+
+
+def _frame(message):
+    return message + minimalmodbus._calculate_crc(message)
+
+
+REQUEST = _frame(b"\x01\x03\x00\x0a\x00\x02")
+RESPONSE = _frame(b"\x01\x03\x04\x00\x01\x00\x02")
+EXCEPTION_RESPONSE = _frame(b"\x01\x83\x02")
+
+
+def test_parser_byte_by_byte():
+    parser = minimalmodbus.RtuFrameParser()
+    frames = []
+    for byte in REQUEST + RESPONSE:
+        frames += parser.feed(bytes((byte,)), 0.0)
+    assert [frame.frametype for frame in frames] == [
+        minimalmodbus.FRAME_REQUEST,
+        minimalmodbus.FRAME_RESPONSE,
+    ]
+    request, response = frames
+    assert request.raw == REQUEST
+    assert response.request is request
+    assert response.data == b"\x04\x00\x01\x00\x02"
+    assert parser.number_of_frames == 2
+    assert parser.dropped_bytes == 0
+
+
+def test_parser_resynchronizes_after_noise():
+    parser = minimalmodbus.RtuFrameParser()
+    frames = parser.feed(b"\x55" + REQUEST + EXCEPTION_RESPONSE, 0.0)
+    assert [frame.frametype for frame in frames] == [
+        minimalmodbus.FRAME_REQUEST,
+        minimalmodbus.FRAME_EXCEPTION,
+    ]
+    assert frames[1].request is frames[0]
+    assert parser.dropped_bytes == 1
+
+
+def test_parser_frame_timeout_drops_incomplete_frame():
+    parser = minimalmodbus.RtuFrameParser(frame_timeout=0.02)
+    assert parser.feed(REQUEST[:5], 0.0) == []
+    frames = parser.feed(REQUEST, 1.0)
+    assert [frame.raw for frame in frames] == [REQUEST]
+    assert frames[0].timestamp == 1.0
+    assert parser.dropped_bytes == 5
+    assert parser.flush() == []